@@ -2,15 +2,23 @@
 
 from __future__ import annotations
 
+import asyncio
+import importlib
 import logging
-from pathlib import Path
-from datetime import timedelta, datetime
+import os
+import re
+from functools import partial
+from collections.abc import Awaitable, Callable, Mapping
+from datetime import timedelta
+from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall, callback
 from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers.debounce import Debouncer
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
 
 from .const import (
     DOMAIN,
@@ -27,342 +35,504 @@ from .const import (
     CONF_PRIORITY_CHECK_INTERVAL,
     CONF_ANOMALY_CHECK_INTERVAL,
     CONF_BASELINE_REFRESH_INTERVAL,
+    BASELINE_INTERVAL_SECONDS,
     CONF_LEARNING_MODE,
     CONF_DEFAULT_SIGMA,
     MODEL_MAPPING,
+    DEFAULT_MODEL_ID,
     DEFAULT_STANDARD_CHECK_INTERVAL,
     DEFAULT_PRIORITY_CHECK_INTERVAL,
-    SCAN_INTERVAL_OPTIONS,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
 INPUT_SELECT_ENTITY = "input_select.ai_support_report_file"
 
+# Czas (s) oczekiwania na kolejne zmiany opcji przed ich zastosowaniem
+OPTIONS_DEBOUNCE_COOLDOWN = 0.2
+
+_REPORT_NAME_RE = re.compile(r"(\d{4}-\d{2}-\d{2})(?:_(\d+))?\.json")
+
+def report_sort_key(name: str) -> tuple[str, int]:
+    """Chronological sort key for report file names (YYYY-MM-DD[_N].json)."""
+    if m := _REPORT_NAME_RE.fullmatch(name):
+        return m.group(1), int(m.group(2) or 1)
+    # Pliki spoza schematu nazw traktujemy jako najstarsze
+    return "", 0
+
+# Cache listy raportów: ścieżka katalogu -> (st_mtime_ns, posortowane nazwy plików)
+_REPORTS_CACHE: dict[str, tuple[int, list[str]]] = {}
+
+def _list_reports_sync(reports_dir: str) -> list[str] | None:
+    """Return report file names (newest first), rescanning only when the directory changed."""
+    try:
+        mtime_ns = os.stat(reports_dir).st_mtime_ns
+    except FileNotFoundError:
+        _REPORTS_CACHE.pop(reports_dir, None)
+        return None
+    cached = _REPORTS_CACHE.get(reports_dir)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+    with os.scandir(reports_dir) as it:
+        files = sorted(
+            (e.name for e in it if e.name.endswith(".json") and e.is_file()),
+            key=report_sort_key,
+            reverse=True,
+        )
+    _REPORTS_CACHE[reports_dir] = (mtime_ns, files)
+    return files
+
+# Co ile sekund sprawdzeń standardowych czyścić nieistniejące encje
+ENTITY_CLEANUP_INTERVAL = 86400
+
+# Opcja interwału -> typ sprawdzania anomalii
+INTERVAL_CHECK_TYPES = {
+    CONF_STANDARD_CHECK_INTERVAL: "standard",
+    CONF_PRIORITY_CHECK_INTERVAL: "priority",
+    CONF_ANOMALY_CHECK_INTERVAL: "anomaly",
+}
+
+class AnomalyCheckScheduler:
+    """Drive all periodic anomaly checks from a single loop timer."""
+
+    def __init__(self, hass: HomeAssistant, ai_coordinator) -> None:
+        self.hass = hass
+        self.ai_coordinator = ai_coordinator
+        # typ sprawdzania -> [interwał w sekundach, termin wg loop.time()]
+        self._checks: dict[str, list[float]] = {}
+        self._handle: asyncio.TimerHandle | None = None
+        # Sekundy sprawdzeń standardowych od ostatniego czyszczenia encji
+        self._cleanup_elapsed = 0.0
+
+    @callback
+    def async_set_interval(self, check_type: str, interval: timedelta) -> None:
+        """(Re)schedule a check type to run every `interval`."""
+        interval_s = interval.total_seconds()
+        self._checks[check_type] = [interval_s, self.hass.loop.time() + interval_s]
+        self._async_arm()
+
+    @callback
+    def async_cancel(self) -> None:
+        """Stop all scheduled checks."""
+        self._checks.clear()
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+
+    @callback
+    def _async_arm(self) -> None:
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+        if self._checks:
+            next_due = min(check[1] for check in self._checks.values())
+            self._handle = self.hass.loop.call_at(next_due, self._async_tick)
+
+    @callback
+    def _async_count_cleanup(self, interval_s: float) -> None:
+        """Clean monitored entities once per ENTITY_CLEANUP_INTERVAL of standard checks."""
+        self._cleanup_elapsed += interval_s
+        if self._cleanup_elapsed < ENTITY_CLEANUP_INTERVAL:
+            return
+        self._cleanup_elapsed = 0.0
+        self.hass.async_create_task(
+            self.ai_coordinator.entity_manager.clean_nonexistent_entities(),
+            f"{DOMAIN} entity cleanup",
+            eager_start=True,
+        )
+
+    @callback
+    def _async_tick(self) -> None:
+        self._handle = None
+        now = self.hass.loop.time()
+        for check_type, check in self._checks.items():
+            if check[1] > now:
+                continue
+            # Eagerly: przy wyłączonym monitoringu sprawdzenie kończy się bez kolejkowania zadania
+            self.hass.async_create_task(
+                self.ai_coordinator.async_check_anomalies(check_type),
+                f"{DOMAIN} {check_type} check",
+                eager_start=True,
+            )
+            if check_type == "standard":
+                self._async_count_cleanup(check[0])
+            while check[1] <= now:
+                check[1] += check[0]
+        self._async_arm()
+
+def _preload_modules() -> None:
+    """Import the heavy submodules so entry setup finds them in sys.modules."""
+    importlib.import_module(f"{__name__}.coordinator")
+    importlib.import_module(f"{__name__}.openai_handler")
+
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the Home Assistant AI Support component."""
     hass.data.setdefault(DOMAIN, {})
+    # Import koordynatorów poza pętlą zdarzeń
+    await hass.async_add_executor_job(_preload_modules)
     return True
 
 async def update_input_select_options(hass: HomeAssistant) -> None:
     """Update input_select options with current report files, if helper exists."""
     entity_id = INPUT_SELECT_ENTITY
-    if entity_id not in hass.states.async_entity_ids("input_select"):
+    state = hass.states.get(entity_id)
+    if state is None:
         return
-    reports_dir = Path(hass.config.path("ai_reports"))
-    if reports_dir.exists():
-        files = sorted([f.name for f in reports_dir.glob("*.json")], reverse=True)
+    reports_dir = hass.config.path("ai_reports")
+    files = await hass.async_add_executor_job(_list_reports_sync, reports_dir)
+    if files is not None:
         options = files if files else ["Brak raportów"]
-        await hass.services.async_call(
-            "input_select", "set_options",
-            {"entity_id": entity_id, "options": options}, blocking=False,
-        )
-        state = hass.states.get(entity_id)
-        if state and state.state not in options and options and options[0] != "Brak raportów":
-            await hass.services.async_call(
-                "input_select", "select_option",
-                {"entity_id": entity_id, "option": options[0]}, blocking=False,
+        calls = [
+            hass.services.async_call(
+                "input_select", "set_options",
+                {"entity_id": entity_id, "options": options}, blocking=False,
+            )
+        ]
+        if state.state not in options and options[0] != "Brak raportów":
+            calls.append(
+                hass.services.async_call(
+                    "input_select", "select_option",
+                    {"entity_id": entity_id, "option": options[0]}, blocking=False,
+                )
             )
+        await asyncio.gather(*calls)
+
+async def _handle_model_change(hass: HomeAssistant, config_entry: ConfigEntry, data: dict, data_updates: dict, new_model) -> bool:
+    """Obsłuż zmianę modelu OpenAI."""
+    openai_analyzer = data.get("openai_analyzer")
+    if not openai_analyzer:
+        return False
+    try:
+        model_key = MODEL_MAPPING.get(new_model, DEFAULT_MODEL_ID)
+        await openai_analyzer.update_model(model_key)
+        # Aktualizuj dane wpisu
+        data_updates[CONF_MODEL] = new_model
+        _LOGGER.info("Model OpenAI zaktualizowany na %s", new_model)
+    except Exception as e:
+        _LOGGER.error("Błąd aktualizacji modelu OpenAI: %s", e)
+        await hass.config_entries.async_reload(config_entry.entry_id)
+        return True
+    return False
+
+async def _handle_system_prompt_change(hass: HomeAssistant, config_entry: ConfigEntry, data: dict, data_updates: dict, new_prompt) -> bool:
+    """Obsłuż zmianę promptu systemowego."""
+    openai_analyzer = data.get("openai_analyzer")
+    if not openai_analyzer:
+        return False
+    try:
+        await openai_analyzer.update_system_prompt(new_prompt)
+        # Aktualizuj dane wpisu
+        data_updates[CONF_SYSTEM_PROMPT] = new_prompt
+        _LOGGER.info("Prompt systemowy zaktualizowany")
+    except Exception as e:
+        _LOGGER.error("Błąd aktualizacji promptu systemowego: %s", e)
+    return False
+
+async def _handle_scan_interval_change(hass: HomeAssistant, config_entry: ConfigEntry, data: dict, data_updates: dict, new_interval) -> bool:
+    """Obsłuż zmianę interwału skanowania."""
+    coordinator = data.get("coordinator")
+    if not coordinator:
+        return False
+    try:
+        # Przelicz następny zaplanowany czas wykonania
+        next_run = await coordinator._calculate_next_run_time()
+        coordinator._schedule_next_update(next_run)
+        _LOGGER.info("Interwał skanowania zaktualizowany na %s", new_interval)
+    except Exception as e:
+        _LOGGER.error("Błąd aktualizacji interwału skanowania: %s", e)
+    return False
+
+async def _handle_cost_optimization_change(hass: HomeAssistant, config_entry: ConfigEntry, data: dict, data_updates: dict, enabled) -> bool:
+    """Obsłuż zmianę optymalizacji kosztów."""
+    # Ta opcja nie wymaga żadnych natychmiastowych działań
+    _LOGGER.info("Optymalizacja kosztów zaktualizowana na %s",
+                "włączoną" if enabled else "wyłączoną")
+    return False
+
+async def _handle_log_levels_change(hass: HomeAssistant, config_entry: ConfigEntry, data: dict, data_updates: dict, levels) -> bool:
+    """Obsłuż zmianę poziomów logów."""
+    _LOGGER.info("Poziomy logów zaktualizowane na %s", levels)
+    return False
+
+async def _handle_max_reports_change(hass: HomeAssistant, config_entry: ConfigEntry, data: dict, data_updates: dict, max_reports) -> bool:
+    """Obsłuż zmianę maksymalnej liczby raportów."""
+    coordinator = data.get("coordinator")
+    if not coordinator:
+        return False
+    try:
+        await coordinator._cleanup_old_reports()
+        _LOGGER.info("Maksymalna liczba raportów zaktualizowana na %s", max_reports)
+    except Exception as e:
+        _LOGGER.error("Błąd aktualizacji maksymalnej liczby raportów: %s", e)
+    return False
+
+async def _handle_entity_count_change(hass: HomeAssistant, config_entry: ConfigEntry, data: dict, data_updates: dict, entity_count) -> bool:
+    """Obsłuż zmianę liczby encji."""
+    ai_coordinator = data.get("ai_coordinator")
+    if ai_coordinator:
+        ai_coordinator.entity_count = int(entity_count)
+        _LOGGER.info("Liczba encji zaktualizowana na %s", entity_count)
+    return False
+
+def _make_check_interval_handler(interval_option: str):
+    """Zbuduj handler zmiany interwału sprawdzania anomalii."""
+    async def _handle_check_interval_change(hass: HomeAssistant, config_entry: ConfigEntry, data: dict, data_updates: dict, new_interval_value) -> bool:
+        _LOGGER.info("Dynamicznie aktualizuję interwał %s na %s", interval_option, new_interval_value)
+
+        if scheduler := data.get("anomaly_scheduler"):
+            scheduler.async_set_interval(
+                INTERVAL_CHECK_TYPES[interval_option],
+                timedelta(minutes=int(new_interval_value)),
+            )
+
+        # Aktualizuj dane wpisu konfiguracyjnego
+        data_updates[interval_option] = new_interval_value
+        return False
+    return _handle_check_interval_change
+
+async def _handle_baseline_refresh_change(hass: HomeAssistant, config_entry: ConfigEntry, data: dict, data_updates: dict, new_interval) -> bool:
+    """Obsłuż zmianę parametrów baseline."""
+    ai_coordinator = data.get("ai_coordinator")
+    if not ai_coordinator:
+        return False
+    try:
+        seconds = BASELINE_INTERVAL_SECONDS.get(new_interval)
+        if seconds is None:
+            raise ValueError(f"Nieznany interwał odświeżania baseline: {new_interval}")
+        ai_coordinator.update_interval = timedelta(seconds=seconds)
+        _LOGGER.info("Interwał odświeżania baseline zaktualizowany na %s", new_interval)
+    except Exception as e:
+        _LOGGER.error("Błąd aktualizacji interwału odświeżania baseline: %s", e)
+    return False
+
+async def _handle_learning_mode_change(hass: HomeAssistant, config_entry: ConfigEntry, data: dict, data_updates: dict, new_mode) -> bool:
+    """Obsłuż zmianę trybu uczenia."""
+    ai_coordinator = data.get("ai_coordinator")
+    if not ai_coordinator:
+        return False
+    ai_coordinator.learning_mode = new_mode
+
+    if new_mode:
+        # Włącz tryb uczenia
+        ai_coordinator._learning_end = dt_util.now() + timedelta(days=7)
+        hass.async_create_task(ai_coordinator.start_baseline_building())
+        ai_coordinator._learning_unsub = async_track_time_interval(
+            hass, ai_coordinator._learning_callback, ai_coordinator.update_interval
+        )
+        _LOGGER.info("Włączono tryb uczenia na 7 dni")
+    elif ai_coordinator._learning_unsub:
+        # Wyłącz tryb uczenia
+        ai_coordinator._learning_unsub()
+        ai_coordinator._learning_unsub = None
+        _LOGGER.info("Wyłączono tryb uczenia")
+    return False
+
+async def _handle_sigma_change(hass: HomeAssistant, config_entry: ConfigEntry, data: dict, data_updates: dict, sigma) -> bool:
+    """Obsłuż zmianę czułości."""
+    ai_coordinator = data.get("ai_coordinator")
+    if ai_coordinator and hasattr(ai_coordinator, 'anomaly_detector'):
+        new_sigma = float(sigma)
+        ai_coordinator.anomaly_detector.current_sensitivity = new_sigma
+        await ai_coordinator.anomaly_detector._save_sensitivity()
+        _LOGGER.info("Czułość wykrywania anomalii zaktualizowana na %s", new_sigma)
+    return False
+
+# Opcje wymagające pełnego przeładowania
+_RELOAD_REQUIRED_OPTIONS = frozenset({CONF_API_KEY, CONF_DIAGNOSTIC_INTEGRATION})
+
+# Opcja -> handler zmiany; handler zwraca True, jeśli wpis został przeładowany
+_OPTION_HANDLERS: dict[
+    str, Callable[[HomeAssistant, ConfigEntry, dict, dict, Any], Awaitable[bool]]
+] = {
+    CONF_MODEL: _handle_model_change,
+    CONF_SYSTEM_PROMPT: _handle_system_prompt_change,
+    CONF_SCAN_INTERVAL: _handle_scan_interval_change,
+    CONF_COST_OPTIMIZATION: _handle_cost_optimization_change,
+    CONF_LOG_LEVELS: _handle_log_levels_change,
+    CONF_MAX_REPORTS: _handle_max_reports_change,
+    CONF_ENTITY_COUNT: _handle_entity_count_change,
+    **{opt: _make_check_interval_handler(opt) for opt in INTERVAL_CHECK_TYPES},
+    CONF_BASELINE_REFRESH_INTERVAL: _handle_baseline_refresh_change,
+    CONF_LEARNING_MODE: _handle_learning_mode_change,
+    CONF_DEFAULT_SIGMA: _handle_sigma_change,
+}
+
+def _diff_options(old_options: Mapping[str, Any], new_options: dict) -> dict:
+    """Return options from `new_options` whose values differ from `old_options`."""
+    return {key: value for key, value in new_options.items() if old_options.get(key) != value}
 
 async def options_update_listener(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
     """Obsługa zmiany opcji konfiguracji."""
-    old_data = dict(config_entry.data)
-    new_options = dict(config_entry.options)
-    
     # Sprawdź, czy istnieją dane integracji
-    if not hass.data[DOMAIN].get(config_entry.entry_id):
+    data = hass.data[DOMAIN].get(config_entry.entry_id)
+    if not data:
         await hass.config_entries.async_reload(config_entry.entry_id)
         return
+
+    # Zbierz szybko następujące po sobie zmiany w jedno zastosowanie
+    await data["_options_debouncer"].async_call()
+
+async def _async_apply_option_changes(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Zastosuj bieżące opcje wpisu po upływie okresu debounce."""
+    data = hass.data[DOMAIN].get(config_entry.entry_id)
+    if not data:
+        return
+    new_options = dict(config_entry.options)
     
-    data = hass.data[DOMAIN][config_entry.entry_id]
-    coordinator = data.get("coordinator")
-    ai_coordinator = data.get("ai_coordinator")
-    openai_analyzer = data.get("openai_analyzer")
-    
-    # Sprawdź, które opcje się zmieniły
-    changed_options = {k: v for k, v in new_options.items() if old_data.get(k) != v}
+    # Sprawdź, które opcje się zmieniły względem poprzednio obsłużonych
+    changed_options = _diff_options(data.get("_last_options", config_entry.data), new_options)
+    data["_last_options"] = new_options
     
     # Jeśli nie ma zmian, zakończ
     if not changed_options:
         return
     
-    # Lista opcji wymagających pełnego przeładowania
-    reload_required_options = [CONF_API_KEY, CONF_DIAGNOSTIC_INTEGRATION]
-    
     # Sprawdź czy któraś z krytycznych opcji się zmieniła
-    if any(opt in changed_options for opt in reload_required_options):
+    if not _RELOAD_REQUIRED_OPTIONS.isdisjoint(changed_options):
         await hass.config_entries.async_reload(config_entry.entry_id)
         return
     
-    # Obsłuż zmianę modelu OpenAI
-    if CONF_MODEL in changed_options and openai_analyzer:
-        try:
-            new_model = changed_options[CONF_MODEL]
-            model_key = MODEL_MAPPING[new_model]
-            await openai_analyzer.update_model(model_key)
-            # Aktualizuj dane wpisu
-            new_data = {**config_entry.data, CONF_MODEL: new_model}
-            hass.config_entries.async_update_entry(config_entry, data=new_data)
-            _LOGGER.info("Model OpenAI zaktualizowany na %s", new_model)
-        except Exception as e:
-            _LOGGER.error("Błąd aktualizacji modelu OpenAI: %s", e)
-            await hass.config_entries.async_reload(config_entry.entry_id)
+    # Wywołaj handlery tylko dla zmienionych opcji
+    data_updates: dict[str, Any] = {}
+    for key, value in changed_options.items():
+        handler = _OPTION_HANDLERS.get(key)
+        if handler and await handler(hass, config_entry, data, data_updates, value):
             return
-    
-    # Obsłuż zmianę promptu systemowego
-    if CONF_SYSTEM_PROMPT in changed_options and openai_analyzer:
-        try:
-            new_prompt = changed_options[CONF_SYSTEM_PROMPT]
-            await openai_analyzer.update_system_prompt(new_prompt)
-            # Aktualizuj dane wpisu
-            new_data = {**config_entry.data, CONF_SYSTEM_PROMPT: new_prompt}
-            hass.config_entries.async_update_entry(config_entry, data=new_data)
-            _LOGGER.info("Prompt systemowy zaktualizowany")
-        except Exception as e:
-            _LOGGER.error("Błąd aktualizacji promptu systemowego: %s", e)
-    
-    # Obsłuż zmianę interwału skanowania
-    if CONF_SCAN_INTERVAL in changed_options and coordinator:
-        try:
-            new_interval = changed_options[CONF_SCAN_INTERVAL]
-            interval_days = SCAN_INTERVAL_OPTIONS.get(new_interval, 7)
-            # Przelicz następny zaplanowany czas wykonania
-            if coordinator._calculate_next_run_time:
-                next_run = coordinator._calculate_next_run_time()
-                coordinator._schedule_next_update(next_run)
-            _LOGGER.info("Interwał skanowania zaktualizowany na %s", new_interval)
-        except Exception as e:
-            _LOGGER.error("Błąd aktualizacji interwału skanowania: %s", e)
-    
-    # Obsłuż zmianę optymalizacji kosztów
-    if CONF_COST_OPTIMIZATION in changed_options:
-        # Ta opcja nie wymaga żadnych natychmiastowych działań
-        _LOGGER.info("Optymalizacja kosztów zaktualizowana na %s", 
-                    "włączoną" if changed_options[CONF_COST_OPTIMIZATION] else "wyłączoną")
-    
-    # Obsłuż zmianę poziomów logów
-    if CONF_LOG_LEVELS in changed_options:
-        _LOGGER.info("Poziomy logów zaktualizowane na %s", changed_options[CONF_LOG_LEVELS])
-    
-    # Obsłuż zmianę maksymalnej liczby raportów
-    if CONF_MAX_REPORTS in changed_options and coordinator:
-        try:
-            await coordinator._cleanup_old_reports()
-            _LOGGER.info("Maksymalna liczba raportów zaktualizowana na %s", changed_options[CONF_MAX_REPORTS])
-        except Exception as e:
-            _LOGGER.error("Błąd aktualizacji maksymalnej liczby raportów: %s", e)
-    
-    # Obsłuż zmianę liczby encji
-    if CONF_ENTITY_COUNT in changed_options and ai_coordinator:
-        ai_coordinator.entity_count = int(changed_options[CONF_ENTITY_COUNT])
-        _LOGGER.info("Liczba encji zaktualizowana na %s", changed_options[CONF_ENTITY_COUNT])
-    
-    # Obsłuż zmianę interwałów sprawdzania
-    interval_options = [
-        CONF_STANDARD_CHECK_INTERVAL,
-        CONF_PRIORITY_CHECK_INTERVAL,
-        CONF_ANOMALY_CHECK_INTERVAL
-    ]
-
-    for interval_option in interval_options:
-        if interval_option in changed_options:
-            new_interval_value = changed_options[interval_option]
-            _LOGGER.info("Dynamicznie aktualizuję interwał %s na %s", interval_option, new_interval_value)
-            
-            # Anuluj istniejący callback, jeśli istnieje
-            unsub_callback = data.get(f"{interval_option}_callback")
-            if unsub_callback:
-                unsub_callback()
-            
-            # Ustal typ interwału i utwórz nowy callback
-            if interval_option == CONF_STANDARD_CHECK_INTERVAL:
-                interval = timedelta(minutes=int(new_interval_value))
-                new_unsub = async_track_time_interval(
-                    hass,
-                    lambda now: hass.async_create_task(ai_coordinator.async_check_anomalies("standard")),
-                    interval
-                )
-                data[f"{interval_option}_callback"] = new_unsub
-            
-            elif interval_option == CONF_PRIORITY_CHECK_INTERVAL:
-                interval = timedelta(minutes=int(new_interval_value))
-                new_unsub = async_track_time_interval(
-                    hass,
-                    lambda now: hass.async_create_task(ai_coordinator.async_check_anomalies("priority")),
-                    interval
-                )
-                data[f"{interval_option}_callback"] = new_unsub
-            
-            elif interval_option == CONF_ANOMALY_CHECK_INTERVAL:
-                # Jeśli masz specjalne obsługiwanie anomalii
-                # np. funkcję z innych argumentami
-                interval = timedelta(minutes=int(new_interval_value))
-                new_unsub = async_track_time_interval(
-                    hass,
-                    lambda now: hass.async_create_task(ai_coordinator.async_check_anomalies("anomaly")),
-                    interval
-                )
-                data[f"{interval_option}_callback"] = new_unsub
-            
-            # Aktualizuj dane wpisu konfiguracyjnego
-            new_data = {**config_entry.data, interval_option: new_interval_value}
-            hass.config_entries.async_update_entry(config_entry, data=new_data)  
-    
-    # Obsłuż zmianę parametrów baseline
-    if CONF_BASELINE_REFRESH_INTERVAL in changed_options and ai_coordinator:
-        try:
-            new_interval = changed_options[CONF_BASELINE_REFRESH_INTERVAL]
-            days = int(new_interval.split("_", 1)[0])
-            ai_coordinator.update_interval = timedelta(days=days)
-            _LOGGER.info("Interwał odświeżania baseline zaktualizowany na %s dni", days)
-        except Exception as e:
-            _LOGGER.error("Błąd aktualizacji interwału odświeżania baseline: %s", e)
-    
-    # Obsłuż zmianę trybu uczenia
-    if CONF_LEARNING_MODE in changed_options and ai_coordinator:
-        new_mode = changed_options[CONF_LEARNING_MODE]
-        ai_coordinator.learning_mode = new_mode
-        
-        if new_mode:
-            # Włącz tryb uczenia
-            now = datetime.now(tz=zoneinfo.ZoneInfo(hass.config.time_zone))
-            ai_coordinator._learning_end = now + timedelta(days=7)
-            hass.async_create_task(ai_coordinator.start_baseline_building())
-            ai_coordinator._learning_unsub = async_track_time_interval(
-                hass, ai_coordinator._learning_callback, ai_coordinator.update_interval
-            )
-            _LOGGER.info("Włączono tryb uczenia na 7 dni")
-        elif ai_coordinator._learning_unsub:
-            # Wyłącz tryb uczenia
-            ai_coordinator._learning_unsub()
-            ai_coordinator._learning_unsub = None
-            _LOGGER.info("Wyłączono tryb uczenia")
-    
-    # Obsłuż zmianę czułości
-    if CONF_DEFAULT_SIGMA in changed_options and ai_coordinator and hasattr(ai_coordinator, 'anomaly_detector'):
-        new_sigma = float(changed_options[CONF_DEFAULT_SIGMA])
-        ai_coordinator.anomaly_detector.current_sensitivity = new_sigma
-        await ai_coordinator.anomaly_detector._save_sensitivity()
-        _LOGGER.info("Czułość wykrywania anomalii zaktualizowana na %s", new_sigma)
+
+    # Jedna aktualizacja danych wpisu dla wszystkich zmian
+    if data_updates:
+        hass.config_entries.async_update_entry(
+            config_entry, data={**config_entry.data, **data_updates}
+        )
     
     # Aktualizuj nasłuchujących, aby odzwierciedlić zmiany
-    if coordinator:
+    if coordinator := data.get("coordinator"):
         coordinator.async_update_listeners()
-    if ai_coordinator:
+    if ai_coordinator := data.get("ai_coordinator"):
         ai_coordinator.async_update_listeners()
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Home Assistant AI Support from a config entry."""
-    try:
-        from .coordinator import AIAnalyticsCoordinator, LogAnalysisCoordinator
-        from .openai_handler import OpenAIAnalyzer
-        # Update dropdown helper if present
-        await update_input_select_options(hass)
-
-        # Initialize domain data
-        hass.data.setdefault(DOMAIN, {})
-
-        # Original coordinator
-        coordinator = LogAnalysisCoordinator(hass, entry)
-        await coordinator._load_stored_next_run_time()
-        await coordinator.analyzer.async_init_client()
-
-        # AI coordinator
-        ai_coordinator = AIAnalyticsCoordinator(hass, entry, coordinator.analyzer)
-        await ai_coordinator.async_config_entry_first_refresh()
-        
-        # Store coordinators and entity list
-        hass.data[DOMAIN][entry.entry_id] = {
-            "coordinator": coordinator,
-            "ai_coordinator": ai_coordinator,
-            "openai_analyzer": coordinator.analyzer,
-            "entities": []
-        }
-
-        # Inicjalizacja słowników przechowujących callbacki interwałów
-        for interval_option in [CONF_STANDARD_CHECK_INTERVAL, CONF_PRIORITY_CHECK_INTERVAL, CONF_ANOMALY_CHECK_INTERVAL]:
-            hass.data[DOMAIN][entry.entry_id][f"{interval_option}_callback"] = None
-
-        # Rejestracja listenera zmian opcji z możliwością późniejszego usunięcia
-        remove_options_listener = entry.add_update_listener(options_update_listener)
-        coordinator._remove_update_listener = remove_options_listener
-        entry.async_on_unload(remove_options_listener)
-
-        # Forward to platforms
-        await hass.config_entries.async_forward_entry_setups(entry, ["sensor", "button"])
-
-        # Register on-demand analysis service
-        async def handle_analyze_now(call):
-            await coordinator.async_request_refresh()
-        hass.services.async_register(DOMAIN, "analyze_now", handle_analyze_now)
-
-        # Register false-alarm reporting service
-        async def handle_report_false_alarm(call):
-            entity_id = call.data.get("entity_id")
-            reason = call.data.get("reason", "Oznaczony jako fałszywy alarm przez użytkownika")
-            if entity_id:
-                await ai_coordinator.anomaly_detector.log_false_alarm(entity_id, reason)
-                ai_coordinator.async_update_listeners()
-        hass.services.async_register(DOMAIN, "report_false_alarm", handle_report_false_alarm)
-
-        # Register monitoring toggle service
-        async def handle_toggle_monitoring(call):
-            enable = call.data.get("enable")
-            if enable is not None:
-                ai_coordinator.monitoring_active = enable
-                state = "włączony" if enable else "wyłączony"
-                _LOGGER.info("Monitoring anomalii został %s", state)
-                ai_coordinator.async_update_listeners()
-        hass.services.async_register(DOMAIN, "toggle_monitoring", handle_toggle_monitoring)
-
-        # Schedule standard checks
-        standard_interval = timedelta(
-            minutes=int(entry.options.get(
-                CONF_STANDARD_CHECK_INTERVAL,
-                DEFAULT_STANDARD_CHECK_INTERVAL
-            ))
-        )
+    from .coordinator import AIAnalyticsCoordinator, LogAnalysisCoordinator
 
-        standard_unsub = async_track_time_interval(
-            hass,
-            lambda now: hass.async_create_task(
-                ai_coordinator.async_check_anomalies("standard")
-            ),
-            standard_interval
-        )
-        hass.data[DOMAIN][entry.entry_id][f"{CONF_STANDARD_CHECK_INTERVAL}_callback"] = standard_unsub
-
-        # Schedule priority checks
-        priority_interval = timedelta(
-            minutes=int(entry.options.get(
-                CONF_PRIORITY_CHECK_INTERVAL,
-                DEFAULT_PRIORITY_CHECK_INTERVAL
-            ))
-        )
+    # Initialize domain data
+    hass.data.setdefault(DOMAIN, {})
 
-        priority_unsub = async_track_time_interval(
-            hass,
-            lambda now: hass.async_create_task(
-                ai_coordinator.async_check_anomalies("priority")
-            ),
-            priority_interval
-        )
-        hass.data[DOMAIN][entry.entry_id][f"{CONF_PRIORITY_CHECK_INTERVAL}_callback"] = priority_unsub
-
-        # Clean up entities daily
-        async def clean_entities_periodically(now=None):
-            await ai_coordinator.entity_manager.clean_nonexistent_entities()
-        async_track_time_interval(
-            hass,
-            clean_entities_periodically,
-            timedelta(days=1)
-        )
+    # Original coordinator
+    coordinator = LogAnalysisCoordinator(hass, entry)
+    # Niezależne kroki startu (lista raportów, termin analizy, klient OpenAI) równolegle
+    # return_exceptions: błąd jednego kroku nie zostawia pozostałych działających w tle
+    reports_result, next_run, client_result = await asyncio.gather(
+        update_input_select_options(hass),
+        coordinator._load_stored_next_run_time(),
+        coordinator.analyzer.async_init_client(),
+        return_exceptions=True,
+    )
+    # Błędy listy raportów i odczytu Store nie są przejściowe - przekazujemy je bez zmian
+    for result in (reports_result, next_run):
+        if isinstance(result, BaseException):
+            raise result
+    # Jako przejściowy (ponowienie startu) traktujemy tylko błąd klienta OpenAI
+    if isinstance(client_result, OSError):
+        raise ConfigEntryNotReady(
+            f"Nie udało się zainicjalizować klienta OpenAI: {client_result}"
+        ) from client_result
+    if isinstance(client_result, BaseException):
+        raise client_result
+
+    # AI coordinator
+    ai_coordinator = AIAnalyticsCoordinator(hass, entry, coordinator.analyzer)
+    await ai_coordinator.async_config_entry_first_refresh()
+
+    # Wspólny timer dla wszystkich sprawdzeń anomalii
+    scheduler = AnomalyCheckScheduler(hass, ai_coordinator)
+    entry.async_on_unload(scheduler.async_cancel)
+    
+    # Store coordinators and entity list
+    hass.data[DOMAIN][entry.entry_id] = {
+        "coordinator": coordinator,
+        "ai_coordinator": ai_coordinator,
+        "openai_analyzer": coordinator.analyzer,
+        "anomaly_scheduler": scheduler,
+        "entities": [],
+        "_last_options": dict(entry.options),
+    }
+
+    # Debouncer dla zmian opcji
+    options_debouncer = Debouncer(
+        hass,
+        _LOGGER,
+        cooldown=OPTIONS_DEBOUNCE_COOLDOWN,
+        immediate=False,
+        function=partial(_async_apply_option_changes, hass, entry),
+    )
+    hass.data[DOMAIN][entry.entry_id]["_options_debouncer"] = options_debouncer
+    entry.async_on_unload(options_debouncer.async_shutdown)
+
+    # Rejestracja listenera zmian opcji, usuwanego przy odładowaniu wpisu
+    entry.async_on_unload(entry.add_update_listener(options_update_listener))
+
+    # Forward to platforms
+    await hass.config_entries.async_forward_entry_setups(entry, ["sensor", "button"])
+
+    # Register on-demand analysis service
+    # Handlery uruchamiają zadania eagerly - bez dodatkowego obiegu pętli
+    @callback
+    def handle_analyze_now(call: ServiceCall) -> None:
+        hass.async_create_task(coordinator.async_request_refresh(), eager_start=True)
+    hass.services.async_register(DOMAIN, "analyze_now", handle_analyze_now)
+
+    # Register false-alarm reporting service
+    async def _report_false_alarm(entity_id: str, reason: str) -> None:
+        await ai_coordinator.anomaly_detector.log_false_alarm(entity_id, reason)
+        ai_coordinator.async_update_listeners()
 
-        return True
+    @callback
+    def handle_report_false_alarm(call: ServiceCall) -> None:
+        entity_id = call.data.get("entity_id")
+        reason = call.data.get("reason", "Oznaczony jako fałszywy alarm przez użytkownika")
+        if entity_id:
+            hass.async_create_task(_report_false_alarm(entity_id, reason), eager_start=True)
+    hass.services.async_register(DOMAIN, "report_false_alarm", handle_report_false_alarm)
+
+    # Register monitoring toggle service
+    @callback
+    def handle_toggle_monitoring(call: ServiceCall) -> None:
+        enable = call.data.get("enable")
+        if enable is not None:
+            ai_coordinator.monitoring_active = enable
+            state = "włączony" if enable else "wyłączony"
+            _LOGGER.info("Monitoring anomalii został %s", state)
+            ai_coordinator.async_update_listeners()
+    hass.services.async_register(DOMAIN, "toggle_monitoring", handle_toggle_monitoring)
+
+    # Schedule standard checks
+    standard_interval = timedelta(
+        minutes=int(entry.options.get(
+            CONF_STANDARD_CHECK_INTERVAL,
+            DEFAULT_STANDARD_CHECK_INTERVAL
+        ))
+    )
+
+    scheduler.async_set_interval("standard", standard_interval)
+
+    # Schedule priority checks
+    priority_interval = timedelta(
+        minutes=int(entry.options.get(
+            CONF_PRIORITY_CHECK_INTERVAL,
+            DEFAULT_PRIORITY_CHECK_INTERVAL
+        ))
+    )
+
+    scheduler.async_set_interval("priority", priority_interval)
+
+    # Timer analizy uzbrajamy dopiero po udanym starcie - nieudana próba
+    # (ConfigEntryNotReady, błąd platform) nie zostawia go w tle
+    coordinator._schedule_next_update(next_run)
+    # Encje są już dodane - pokaż im zaplanowany termin
+    coordinator.async_update_listeners()
 
-    except Exception as err:
-        _LOGGER.error("Setup error: %s", err, exc_info=True)
-        raise ConfigEntryNotReady from err
+    return True
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
@@ -379,28 +549,17 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     coord = data.get("coordinator")
     ai_coord = data.get("ai_coordinator")
 
-    # 3) Usuń listener na zmiany opcji (jeśli był zarejestrowany)
-    if coord and getattr(coord, "_remove_update_listener", None):
-        coord._remove_update_listener()
+    # 3) Anuluj zaplanowaną analizę logów; trwająca analiza nie uzbroi nowego timera
+    if coord:
+        coord.async_cancel_schedule()
 
     # 4) Zamknij klienta OpenAI w LogAnalysisCoordinator
-    if coord and hasattr(coord, "analyzer") and getattr(coord.analyzer, "client", None):
+    if coord and coord.analyzer.client:
         await coord.analyzer.close()
 
     # 5) Unsubscribe learning mode w AIAnalyticsCoordinator
-    if ai_coord and getattr(ai_coord, "_learning_unsub", None):
+    if ai_coord and ai_coord._learning_unsub:
         ai_coord._learning_unsub()
         ai_coord._learning_unsub = None
 
-    interval_options = [
-        CONF_STANDARD_CHECK_INTERVAL,
-        CONF_PRIORITY_CHECK_INTERVAL,
-        CONF_ANOMALY_CHECK_INTERVAL
-    ]
-    
-    for interval_option in interval_options:
-        unsub_callback = data.get(f"{interval_option}_callback")
-        if unsub_callback:
-            unsub_callback()
-
     return True
\ No newline at end of file
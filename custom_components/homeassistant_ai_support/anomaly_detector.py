@@ -6,6 +6,8 @@ import logging
 import statistics
 import zoneinfo
 
+import orjson
+
 from homeassistant.core import HomeAssistant
 from homeassistant.components.recorder.history import get_significant_states
 from homeassistant.helpers.storage import Store
@@ -41,6 +43,32 @@ ALL_DOMAINS = [
     "update", "vacuum", "valve", "wake_word", "water_heater", "weather"
 ]
 
+def _load_json_sync(path: Path):
+    """Load a JSON file; returns None if it does not exist."""
+    try:
+        with open(path, "rb") as f:
+            # Standardowy json: starsze baseline mogą zawierać NaN/Infinity,
+            # których orjson nie przyjmuje
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+def _write_entities_sync(entities_dir: Path, entities_file: Path, payload: bytes) -> None:
+    """Create the entities directory if needed and write the file in one job."""
+    # Sprawdź, czy ścieżka docelowa dla katalogu nie istnieje jako plik
+    if entities_dir.is_file():
+        _LOGGER.error(
+            "Ścieżka docelowa dla katalogu encji '%s' istnieje jako plik. "
+            "Proszę ręcznie usunąć ten plik lub zmienić jego nazwę, aby integracja mogła utworzyć katalog.",
+            entities_dir,
+        )
+        # Rzuć wyjątek, aby proces został przerwany i błąd był widoczny
+        raise FileExistsError(
+            f"Nie można utworzyć katalogu {entities_dir}, ponieważ plik o tej nazwie już istnieje."
+        )
+    entities_dir.mkdir(parents=True, exist_ok=True)
+    entities_file.write_bytes(payload)
+
 async def safe_get_nested(dictionary, *keys, default=None):
     """Bezpiecznie pobiera wartość z zagnieżdżonego słownika."""
     for key in keys:
@@ -72,12 +100,8 @@ class EntityManager:
 
         # Wczytaj z pliku JSON, jeśli użytkownik edytował
         try:
-            if self.entities_file.exists():
-                def read_file():
-                    with open(self.entities_file, 'r', encoding='utf-8') as f:
-                        return json.load(f)
-
-                raw = await self.hass.async_add_executor_job(read_file)
+            raw = await self.hass.async_add_executor_job(_load_json_sync, self.entities_file)
+            if raw is not None:
                 # WALIDACJA: musi być dict z trzema listami
                 if (
                     isinstance(raw, dict)
@@ -102,37 +126,17 @@ class EntityManager:
 
     async def _save_to_file(self) -> None:
         """Zapisuje aktualne encje do pliku JSON w katalogu ai_selected_entities."""
+        payload = orjson.dumps(self.monitored_entities, option=orjson.OPT_INDENT_2)
         try:
-            # Sprawdź, czy ścieżka docelowa dla katalogu nie istnieje jako plik
-            if await self.hass.async_add_executor_job(self.entities_dir.is_file):
-                _LOGGER.error(
-                    f"Ścieżka docelowa dla katalogu encji '{self.entities_dir}' istnieje jako plik. "
-                    f"Proszę ręcznie usunąć ten plik lub zmienić jego nazwę, aby integracja mogła utworzyć katalog."
-                )
-                # Rzuć wyjątek, aby proces został przerwany i błąd był widoczny
-                raise FileExistsError(
-                    f"Nie można utworzyć katalogu {self.entities_dir}, ponieważ plik o tej nazwie już istnieje."
-                )
-
-            # Utwórz katalog, jeśli nie istnieje - poprawione wywołanie mkdir
-            # Używamy nazwanych argumentów parents=True, exist_ok=True
+            # Sprawdzenie ścieżki, utworzenie katalogu i zapis w jednym zadaniu executora
             await self.hass.async_add_executor_job(
-                lambda: self.entities_dir.mkdir(parents=True, exist_ok=True)
+                _write_entities_sync, self.entities_dir, self.entities_file, payload
             )
-
-            # Zapis do pliku
-            await self._write_json_file()
             _LOGGER.info("Zapisano wykryte encje do pliku: %s", self.entities_file)
 
         except Exception as e:
             _LOGGER.error("Błąd podczas zapisywania pliku JSON encji (%s): %s", self.entities_file, e)
             raise
-
-    async def _write_json_file(self) -> None:
-        """Zapisuje dane encji do pliku JSON."""
-        import aiofiles
-        async with aiofiles.open(self.entities_file, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(self.monitored_entities, ensure_ascii=False, indent=2))
             
     async def save(self) -> None:
         """Zapisuje listę encji do .storage i do pliku JSON."""
@@ -261,9 +265,11 @@ class BaselineBuilder:
         self.em = entity_manager
         
         # Załaduj z opcji
-        entry_id = next(iter(hass.data[DOMAIN].keys()), None)
+        domain_data = hass.data[DOMAIN]
+        entry_id = next(iter(domain_data), None)
+        options = {}
         if entry_id:
-            options = hass.data[DOMAIN][entry_id].get("entry", {}).options or {}
+            options = domain_data[entry_id].get("entry", {}).options or {}
             self.default_window = int(options.get(CONF_BASELINE_WINDOW_DAYS, DEFAULT_BASELINE_WINDOW_DAYS))
             self.default_sigma = float(options.get(CONF_DEFAULT_SIGMA, DEFAULT_SIGMA))
         else:
@@ -275,7 +281,6 @@ class BaselineBuilder:
         
         # Załaduj konfigurację czułości per-encja
         if entry_id:
-            options = hass.data[DOMAIN][entry_id].get("entry", {}).options or {}
             entity_sensitivity = options.get(CONF_ENTITY_SENSITIVITY, {})
             if entity_sensitivity and isinstance(entity_sensitivity, dict):
                 self.entity_sensitivity = entity_sensitivity
@@ -299,21 +304,26 @@ class BaselineBuilder:
         # Zbierz historię
         raw_history = await self._collect_history(selected, wnd)
         
-        # Zbuduj modele
+        # Statystyki po historii z wielu dni to praca CPU - poza pętlą zdarzeń
+        models = await self.hass.async_add_executor_job(self._build_models, raw_history, wnd)
+        
+        # Zapisz do jednego pliku
+        await self._write_models(models)
+        
+        return models
+
+    def _build_models(self, raw_history: dict, window_days: int) -> dict:
+        """Zbuduj modele dla wszystkich encji (wywoływane w executorze)."""
         models = {}
         for ent, states in raw_history.items():
             dtype = self._detect_type(states)
             if dtype == "numeric":
                 # Przekazuj entity_id dla spersonalizowanego sigma
-                models[ent] = self._model_numeric(states, wnd, ent)
+                models[ent] = self._model_numeric(states, window_days, ent)
             elif dtype == "binary":
-                models[ent] = self._model_binary(states, wnd)
+                models[ent] = self._model_binary(states, window_days)
             elif dtype == "categorical":
-                models[ent] = self._model_categorical(states, wnd)
-        
-        # Zapisz do jednego pliku
-        await self._write_models(models)
-        
+                models[ent] = self._model_categorical(states, window_days)
         return models
 
     async def _collect_history(self, entities: list, window_days: int) -> dict:
@@ -326,20 +336,16 @@ class BaselineBuilder:
             batch_result = {}
             for ent in entity_list:
                 try:
-                    batch_result[ent] = get_significant_states(self.hass, ent, start, end)
+                    states = get_significant_states(self.hass, ent, start, end)
                 except Exception as e:
                     _LOGGER.warning("Historia %s nie dostępna: %s", ent, e)
+                    continue
+                # Format entity_id -> [stany] budujemy od razu w executorze
+                batch_result[ent] = [s.state for s in states]
             return batch_result
             
         # Wykonaj całe pobieranie jako jedno zadanie
-        raw_states = await self.hass.async_add_executor_job(fetch_states_batch, entities)
-        
-        # Przekształć wyniki w format: entity_id -> [stany]
-        history = {}
-        for ent, states in raw_states.items():
-            history[ent] = [s.state for s in states]
-            
-        return history
+        return await self.hass.async_add_executor_job(fetch_states_batch, entities)
 
     def _detect_type(self, states: list) -> str:
         # numeric: parsowalne jako float
@@ -417,9 +423,10 @@ class BaselineBuilder:
         }
 
     async def _write_models(self, models: dict) -> None:
-        import aiofiles
-        async with aiofiles.open(self.baseline_path, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(models, ensure_ascii=False, indent=2))
+        # Standardowy json: orjson zapisałby NaN/Infinity (stany "nan"/"inf") jako null
+        payload = json.dumps(models, ensure_ascii=False, indent=2).encode("utf-8")
+        # Jeden skok do executora zamiast osobnych dla open/write/close
+        await self.hass.async_add_executor_job(self.baseline_path.write_bytes, payload)
 
 
     @staticmethod
@@ -436,13 +443,16 @@ class AnomalyDetector:
     def __init__(self, hass):
         """Initialize the anomaly detector."""
         self.hass = hass
+        # Strefa czasowa HA - tworzona raz, a nie przy każdym znaczniku czasu
+        self._tz = zoneinfo.ZoneInfo(hass.config.time_zone)
         self.sensitivity_store = Store(hass, 1, f"{DOMAIN}_sensitivity")
         self.false_alarm_count = 0
         
         # Załaduj domyślną czułość z konfiguracji
-        entry_id = next(iter(self.hass.data[DOMAIN].keys()), None)
-        if entry_id and "entry" in self.hass.data[DOMAIN][entry_id]:
-            entry_data = self.hass.data[DOMAIN][entry_id].get("entry", {})
+        domain_data = self.hass.data[DOMAIN]
+        entry_id = next(iter(domain_data), None)
+        if entry_id and "entry" in domain_data[entry_id]:
+            entry_data = domain_data[entry_id].get("entry", {})
             options = getattr(entry_data, "options", {}) if hasattr(entry_data, "options") else {}
             self.current_sensitivity = float(options.get(CONF_DEFAULT_SIGMA, DEFAULT_SIGMA))
         else:
@@ -498,16 +508,14 @@ class AnomalyDetector:
         """Detect anomalies in entity data."""
         _LOGGER.debug("Checking for anomalies...")
         
-        # Wczytaj modele baseline
-        if not self.baseline_path.exists():
-            _LOGGER.warning("Brak modelu baseline. Uruchom najpierw budowanie baseline.")
-            return []
-            
         try:
-            # Wczytaj modele - zawsze używaj executor_job
+            # Wczytaj modele baseline - sprawdzenie istnienia i odczyt w jednym zadaniu executora
             baseline_models = await self.hass.async_add_executor_job(
-                lambda: json.load(open(self.baseline_path, 'r', encoding='utf-8'))
+                _load_json_sync, self.baseline_path
             )
+            if baseline_models is None:
+                _LOGGER.warning("Brak modelu baseline. Uruchom najpierw budowanie baseline.")
+                return []
             
             anomalies = []
             # Dla każdej encji sprawdź odchylenia
@@ -536,7 +544,7 @@ class AnomalyDetector:
             
             # Aktualizuj czas ostatniej anomalii i listę anomalii
             if anomalies:
-                self.last_anomaly_time = datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone)).isoformat()
+                self.last_anomaly_time = datetime.now(tz=self._tz).isoformat()
                 self.detected_anomalies = anomalies
                 
             return anomalies
@@ -551,17 +559,16 @@ class AnomalyDetector:
         
         # Wczytaj modele baseline
         try:
-            if not self.baseline_path.exists():
-                _LOGGER.warning("Brak modelu baseline. Uruchom najpierw budowanie baseline.")
-                return []
-            
             # Wczytaj modele używając executor job
             baseline_models = await self.hass.async_add_executor_job(
-                lambda: json.load(open(self.baseline_path, 'r', encoding='utf-8'))
+                _load_json_sync, self.baseline_path
             )
-        except (json.JSONDecodeError, IOError, FileNotFoundError) as e:
+        except (json.JSONDecodeError, IOError) as e:
             _LOGGER.error("Błąd wczytywania modelu baseline: %s", e)
             return []
+        if baseline_models is None:
+            _LOGGER.warning("Brak modelu baseline. Uruchom najpierw budowanie baseline.")
+            return []
         
         # Wybierz encje do sprawdzenia na podstawie priorytetu
         entities_to_check = self.priority_entities if priority else self.standard_entities
@@ -599,7 +606,7 @@ class AnomalyDetector:
         # Aktualizuj czas ostatniej anomalii i listę anomalii
         if anomalies:
             try:
-                self.last_anomaly_time = datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone)).isoformat()
+                self.last_anomaly_time = datetime.now(tz=self._tz).isoformat()
                 
                 # Dodaj do wykrytych anomalii (unikając duplikatów)
                 existing_ids = [a.get("entity_id") for a in self.detected_anomalies]
@@ -657,7 +664,7 @@ class AnomalyDetector:
                     },
                     "severity": severity,
                     "type": "numeric",
-                    "detected_at": datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone)).isoformat(),
+                    "detected_at": datetime.now(tz=self._tz).isoformat(),
                     "friendly_name": state.attributes.get("friendly_name", entity_id)
                 }
         except (ValueError, TypeError) as e:
@@ -673,8 +680,9 @@ class AnomalyDetector:
             flip_threshold = baseline.get("flip_threshold", 0.05)
             
             # Pobierz progi konfiguracyjne
-            entry_id = next(iter(self.hass.data[DOMAIN].keys()), None)
-            options = self.hass.data[DOMAIN][entry_id].get("entry", {}).options if entry_id else {}
+            domain_data = self.hass.data[DOMAIN]
+            entry_id = next(iter(domain_data), None)
+            options = domain_data[entry_id].get("entry", {}).options if entry_id else {}
             
             low_threshold = float(options.get(CONF_BINARY_FLIP_THRESHOLD_LOW, DEFAULT_BINARY_FLIP_THRESHOLD_LOW))
             medium_threshold = float(options.get(CONF_BINARY_FLIP_THRESHOLD_MEDIUM, DEFAULT_BINARY_FLIP_THRESHOLD_MEDIUM))
@@ -698,7 +706,7 @@ class AnomalyDetector:
                     "flip_frequency": round(flip_threshold * 100, 2),
                     "severity": severity,
                     "type": "binary",
-                    "detected_at": datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone)).isoformat(),
+                    "detected_at": datetime.now(tz=self._tz).isoformat(),
                     "friendly_name": state.attributes.get("friendly_name", entity_id)
                 }
             return None
@@ -723,7 +731,7 @@ class AnomalyDetector:
                     "expected_values": list(state_counts.keys()),
                     "severity": "high",
                     "type": "categorical",
-                    "detected_at": datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone)).isoformat(),
+                    "detected_at": datetime.now(tz=self._tz).isoformat(),
                     "friendly_name": state.attributes.get("friendly_name", entity_id)
                 }
             
@@ -744,7 +752,7 @@ class AnomalyDetector:
                         "frequency": round(frequency * 100, 2),
                         "severity": severity,
                         "type": "categorical",
-                        "detected_at": datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone)).isoformat(),
+                        "detected_at": datetime.now(tz=self._tz).isoformat(),
                         "friendly_name": state.attributes.get("friendly_name", entity_id)
                     }
         
@@ -760,8 +768,8 @@ class AnomalyDetector:
             
         try:
             mtime = self.baseline_path.stat().st_mtime
-            last_modified = datetime.fromtimestamp(mtime, tz=zoneinfo.ZoneInfo(self.hass.config.time_zone))
-            now = datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone))
+            last_modified = datetime.fromtimestamp(mtime, tz=self._tz)
+            now = datetime.now(tz=self._tz)
             
             return (now - last_modified).days
         except Exception:
@@ -770,7 +778,7 @@ class AnomalyDetector:
     async def log_false_alarm(self, entity_id, reason):
         """Log a false alarm and remove it from detection list."""
         log_entry = {
-            "timestamp": datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone)).isoformat(),
+            "timestamp": datetime.now(tz=self._tz).isoformat(),
             "entity_id": entity_id,
             "reason": reason,
             "sensitivity": self.current_sensitivity
@@ -4,14 +4,13 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from datetime import datetime
-import zoneinfo
 
 from homeassistant.components.button import ButtonEntity
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.restore_state import RestoreEntity
+from homeassistant.util import dt as dt_util
 
 from .const import DOMAIN
 
@@ -77,7 +76,7 @@ class GenerateReportButton(CoordinatorEntity, ButtonEntity, RestoreEntity):
             return
 
         # Zapisz czytelną datę i godzinę wywołania
-        timestamp = datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone))
+        timestamp = dt_util.now()
         self._last_triggered = timestamp.strftime("%Y-%m-%d %H:%M")
         self.async_write_ha_state()
 
@@ -43,6 +43,8 @@ MODEL_MAPPING = {
 
 MODEL_LIST = list(MODEL_MAPPING.keys())
 DEFAULT_MODEL = "GPT-4.1 mini"
+# Identyfikator modelu API, gdy zapisana etykieta nie występuje w MODEL_MAPPING
+DEFAULT_MODEL_ID = MODEL_MAPPING[DEFAULT_MODEL]
 
 # Prompt systemowy
 DEFAULT_SYSTEM_PROMPT = (
@@ -66,6 +68,15 @@ SCAN_INTERVAL_OPTIONS = {
 
 DEFAULT_SCAN_INTERVAL = SCAN_INTERVAL_7_DAYS
 
+# Ile ostatnich bajtów pliku logów analizować
+MAX_LOG_TAIL_BYTES = 10000
+
+# Maksymalny czas (s) analizy logów przez API, łącznie z ponowieniami
+ANALYSIS_TIMEOUT = 300
+
+# Odstęp (s) kolejnej próby po przerwanej analizie
+ANALYSIS_RETRY_DELAY = 3600
+
 # Godzina generowania raportu (23:50)
 REPORT_GENERATION_HOUR = 23
 REPORT_GENERATION_MINUTE = 50
@@ -78,6 +89,13 @@ BASELINE_REFRESH_OPTIONS = {
     "30_days": "Co 30 dni",
 }
 
+BASELINE_INTERVAL_SECONDS = {
+    "3_days": 3 * 86400,
+    "7_days": 7 * 86400,
+    "14_days": 14 * 86400,
+    "30_days": 30 * 86400,
+}
+
 # Logging constants
 ANOMALY_LOG_DIR = "ai_anomaly_logs"
 FALSE_ALARM_LOG_FILE = "false_alarms.json"
@@ -3,18 +3,24 @@
 from __future__ import annotations
 
 import logging
-import json
-from datetime import datetime, timedelta
+import os
+import re
+from datetime import date, datetime, time, timedelta
 from pathlib import Path
 import asyncio
+import heapq
 import zoneinfo
 
+import orjson
+
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.helpers.event import async_track_point_in_time, async_track_time_interval
 from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
 from typing import Any
+from .anomaly_detector import AnomalyDetector, BaselineBuilder, EntityManager
 from .openai_handler import OpenAIAnalyzer
 
 from .const import (
@@ -24,6 +30,7 @@ from .const import (
     DEFAULT_ENTITY_COUNT,
     CONF_BASELINE_REFRESH_INTERVAL,
     DEFAULT_BASELINE_REFRESH_INTERVAL,
+    BASELINE_INTERVAL_SECONDS,
     CONF_SCAN_INTERVAL,
     DEFAULT_SCAN_INTERVAL,
     SCAN_INTERVAL_OPTIONS,
@@ -31,44 +38,149 @@ from .const import (
     REPORT_GENERATION_MINUTE,
     CONF_COST_OPTIMIZATION,
     CONF_LOG_LEVELS,
+    DEFAULT_LOG_LEVELS,
     CONF_API_KEY,
     CONF_MODEL,
     CONF_MAX_REPORTS,
     CONF_SYSTEM_PROMPT,
     MODEL_MAPPING,
+    DEFAULT_MODEL_ID,
+    MAX_LOG_TAIL_BYTES,
+    ANALYSIS_TIMEOUT,
+    ANALYSIS_RETRY_DELAY,
 )
-from .__init__ import update_input_select_options
+from . import report_sort_key, update_input_select_options
 
 _LOGGER = logging.getLogger(__name__)
 
+# Formularz opcji zapisuje kanoniczne nazwy poziomów; polskie etykiety
+# mogą zostać tylko w opcjach zapisanych przez starsze wersje
+_LEGACY_LEVEL_LABELS = {
+    "Informacyjne": "INFO",
+    "Ostrzeżenia": "WARNING",
+    "Błędy": "ERROR",
+    "Krytyczne": "CRITICAL",
+}
+
+# Godzina generowania raportu jako gotowy obiekt time
+_REPORT_TIME = time(REPORT_GENERATION_HOUR, REPORT_GENERATION_MINUTE)
+
+# Opóźnienie (s) zapisu terminu następnej analizy do Store
+STORE_SAVE_DELAY = 5
+
+def _first_slot_after(first_date: date, now: datetime, interval_days: int) -> datetime:
+    """Return the first report slot after `now`, counting from `first_date` every `interval_days`."""
+    # Zaległe terminy (HA wyłączony, stary raport, zmiana interwału) pomijamy
+    # w całości - timer ustawiony na przeszłość uruchomiłby się natychmiast
+    missed = max(0, (now.date() - first_date).days // interval_days)
+    run_date = first_date + timedelta(days=missed * interval_days)
+    next_run = datetime.combine(run_date, _REPORT_TIME, now.tzinfo)
+    if next_run <= now:
+        next_run = datetime.combine(
+            run_date + timedelta(days=interval_days), _REPORT_TIME, now.tzinfo
+        )
+    return next_run
+
+def _read_log_tail(log_path: Path, max_bytes: int) -> bytes:
+    """Read at most `max_bytes` from the end of the log, starting at a line boundary."""
+    try:
+        f = open(log_path, "rb")
+    except FileNotFoundError:
+        return b""
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        offset = max(0, size - max_bytes)
+        if offset:
+            _LOGGER.info("Ograniczono rozmiar logów z %d do %d bajtów", size, max_bytes)
+            # Od bajtu przed granicą: readline() pomija uciętą linię, a pełną
+            # zachowuje, gdy granica wypada dokładnie na początku linii
+            f.seek(offset - 1)
+            f.readline()
+        return f.read(max_bytes)
+
+def _remove_old_reports_sync(report_dir: Path, max_reports: int) -> list[str]:
+    """Delete the oldest report files so that at most `max_reports` remain.
+
+    Returns the names of the reports that are left.
+    """
+    try:
+        with os.scandir(report_dir) as it:
+            reports = [
+                entry for entry in it
+                if entry.name.endswith(".json") and entry.is_file()
+            ]
+    except FileNotFoundError:
+        return []
+    excess = len(reports) - max_reports
+    if excess <= 0:
+        return [entry.name for entry in reports]
+    # Nazwa pliku wyznacza kolejność raportów - bez stat() dla każdego pliku
+    removed = heapq.nsmallest(excess, reports, key=lambda e: report_sort_key(e.name))
+    for entry in removed:
+        path = entry.path
+        try:
+            os.unlink(path)
+            _LOGGER.debug("Usunięto stary raport: %s", path)
+        except OSError as e:
+            _LOGGER.error("Błąd podczas usuwania raportu %s: %s", path, e)
+    removed_names = {entry.name for entry in removed}
+    return [entry.name for entry in reports if entry.name not in removed_names]
+
+def _latest_report_date_sync(report_dir: Path) -> str | None:
+    """Return the date prefix (YYYY-MM-DD) of the newest report, taken from file names."""
+    try:
+        with os.scandir(report_dir) as it:
+            # Nazwa pliku zawiera datę raportu - nie potrzeba stat() dla każdego pliku
+            newest = max((report_sort_key(entry.name) for entry in it), default=("", 0))
+    except FileNotFoundError:
+        return None
+    return newest[0] or None
+
+def _write_report_sync(report_dir: Path, timestamp: datetime, payload: bytes, max_reports: int) -> Path:
+    """Make room for a new report and write it under a unique per-day file name."""
+    report_dir.mkdir(exist_ok=True)
+    # Najpierw wyczyść stare raporty przed dodaniem nowego; ta sama lista
+    # nazw posłuży do wyboru przyrostka, bez ponownego listowania katalogu
+    remaining = _remove_old_reports_sync(report_dir, max_reports - 1)
+    # Nowy format nazwy pliku: 2025-05-06.json, kolejne tego dnia: 2025-05-06_2.json
+    date_prefix = timestamp.strftime('%Y-%m-%d')
+    same_day = [
+        suffix for prefix, suffix in map(report_sort_key, remaining) if prefix == date_prefix
+    ]
+    filename = f"{date_prefix}_{max(same_day) + 1}.json" if same_day else f"{date_prefix}.json"
+    report_path = report_dir / filename
+    report_path.write_bytes(payload)
+    return report_path
+
 class AIAnalyticsCoordinator(DataUpdateCoordinator[dict[str, Any]]):
     """Coordinator for AI-driven tasks: entity discovery and baseline building with learning mode."""
 
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry, openai_analyzer: OpenAIAnalyzer) -> None:
-        from .anomaly_detector import AnomalyDetector, EntityManager
         # Read user options
         opts = entry.options
         baseline_refresh_opt = opts.get(
             CONF_BASELINE_REFRESH_INTERVAL,
             DEFAULT_BASELINE_REFRESH_INTERVAL,
         )
-        # e.g. "14_days" → 14
-        try:
-            days = int(baseline_refresh_opt.split("_", 1)[0])
-        except Exception:
-            days = 14
-
-        update_interval = timedelta(days=days)
+        update_interval = timedelta(
+            seconds=BASELINE_INTERVAL_SECONDS.get(
+                baseline_refresh_opt,
+                BASELINE_INTERVAL_SECONDS[DEFAULT_BASELINE_REFRESH_INTERVAL],
+            )
+        )
 
         super().__init__(
             hass,
             _LOGGER,
             name="AI Analytics Coordinator",
             update_interval=update_interval,
+            # _async_update_data zwraca zawsze {} - bez powiadomień przy każdym odświeżeniu
+            always_update=False,
         )
 
         self.entry = entry
         self.openai_handler = openai_analyzer
+        self._tz = zoneinfo.ZoneInfo(hass.config.time_zone)
 
         # Entity discovery status container
         self.entity_discovery_status: dict[str, Any] = {
@@ -98,11 +210,11 @@ class AIAnalyticsCoordinator(DataUpdateCoordinator[dict[str, Any]]):
 
         # Core helpers
         self.entity_manager = EntityManager(hass)
-        hass.async_create_task(self.entity_manager.load())
+        hass.async_create_task(self.entity_manager.load(), eager_start=True)
 
         # If learning mode enabled, schedule repeated baseline builds for 7 days
         if self.learning_mode:
-            now = datetime.now(tz=zoneinfo.ZoneInfo(hass.config.time_zone))
+            now = datetime.now(tz=self._tz)
             self._learning_end = now + timedelta(days=7)
             # first immediate build
             hass.async_create_task(self.start_baseline_building())
@@ -121,7 +233,7 @@ class AIAnalyticsCoordinator(DataUpdateCoordinator[dict[str, Any]]):
     @callback
     def _learning_callback(self, now: datetime) -> None:
         """Periodic callback during learning mode."""
-        if self._learning_end and datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone)) >= self._learning_end:
+        if self._learning_end and datetime.now(tz=self._tz) >= self._learning_end:
             _LOGGER.info("Learning mode finished after 7 days, disabling.")
             if self._learning_unsub:
                 self._learning_unsub()
@@ -137,8 +249,7 @@ class AIAnalyticsCoordinator(DataUpdateCoordinator[dict[str, Any]]):
 
     async def start_baseline_building(self) -> None:
         """Build or rebuild the anomaly baseline for selected entities."""
-        from .anomaly_detector import BaselineBuilder
-        tz = zoneinfo.ZoneInfo(self.hass.config.time_zone)
+        tz = self._tz
         self.baseline_status.update({
             "status": "initialization",
             "status_description": "Inicjalizacja baseline",
@@ -176,7 +287,7 @@ class AIAnalyticsCoordinator(DataUpdateCoordinator[dict[str, Any]]):
 
     async def start_entity_discovery(self) -> None:
         """Discover key entities via AI, updating progress at each stage."""
-        tz = zoneinfo.ZoneInfo(self.hass.config.time_zone)
+        tz = self._tz
         now_iso = datetime.now(tz=tz).isoformat()
 
         # 1) Initialization
@@ -294,24 +405,40 @@ class LogAnalysisCoordinator(DataUpdateCoordinator[dict[str, Any]]):
     """Class to manage fetching log analysis data."""
 
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
-        from .openai_handler import OpenAIAnalyzer
         self.entry = entry
         self.analyzer = OpenAIAnalyzer(
             hass=hass,
             api_key=entry.data[CONF_API_KEY],
-            model=MODEL_MAPPING[entry.data.get(CONF_MODEL, "GPT-4.1 mini")],
+            model=MODEL_MAPPING.get(entry.data.get(CONF_MODEL), DEFAULT_MODEL_ID),
             system_prompt=entry.data.get(CONF_SYSTEM_PROMPT, "")
         )
         self.hass = hass
+        self._tz = zoneinfo.ZoneInfo(hass.config.time_zone)
+        # Anulowanie zaplanowanej analizy; zawsze ustawione (None, gdy brak)
         self._remove_update_listener = None
-        self._first_startup = True
+        # Ustawiane przy wyładowaniu wpisu - trwająca analiza nie uzbroi już nowego timera
+        self._unloaded = False
+        # Termin zaplanowanej analizy (strefa HA); zapisywany do Store z opóźnieniem
+        self._next_run: datetime | None = None
+        # Dane ostatnio zleconego zapisu do Store
+        self._last_persisted: dict[str, Any] | None = None
+        # Czas najnowszego raportu; odczytywany z katalogu tylko przy pierwszym użyciu
+        self._last_report_time: datetime | None = None
+        self._last_report_scanned = False
         self.logger = _LOGGER
         self._store = Store(hass, 1, f"{DOMAIN}_{entry.entry_id}")
+        self._cleanup_lock = asyncio.Lock()
+        self._cleanup_pending: asyncio.Task | None = None
+        # Wyszukiwarka poziomów, odbudowywana tylko po zmianie opcji
+        self._level_key: tuple | None = None
+        self._level_search = None
         super().__init__(
             hass,
             _LOGGER,
             name=DOMAIN,
             update_interval=None,
+            # Encje odświeżane tylko, gdy dane koordynatora faktycznie się zmieniły
+            always_update=False,
         )
         self.data = {
             "status": "waiting",
@@ -322,37 +449,22 @@ class LogAnalysisCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         }
 
     async def _async_update_data(self) -> dict[str, Any]:
-        if self._first_startup:
-            self._first_startup = False
-            next_run = self._calculate_next_run_time()
-            next_run_with_tz = next_run.replace(tzinfo=zoneinfo.ZoneInfo(self.hass.config.time_zone))
-            self.data["next_scheduled_run"] = next_run_with_tz.isoformat()
-            self._schedule_next_update(next_run)
-            return self.data
+        # Start i odczyt logów następują bez przerwy - jedno powiadomienie zamiast dwóch
         self.data = {
             **self.data,
-            "status": "generating",
-            "status_description": "Rozpoczynam analizę logów",
-            "progress": 0,
-            "last_update": datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone)).isoformat(),
+            "status": "reading_logs",
+            "status_description": "Odczytuję i filtruję logi według wybranych poziomów",
+            "progress": 10,
+            "last_update": self._now_iso(),
         }
         self.async_update_listeners()
         try:
-            self.data["status"] = "reading_logs"
-            self.data["status_description"] = "Odczytuję pliki logów"
-            self.data["progress"] = 10
-            self.async_update_listeners()
-            raw_logs = await self._get_system_logs()
-            self.data["status"] = "filtering_logs"
-            self.data["status_description"] = "Filtruję logi według wybranych poziomów"
-            self.data["progress"] = 30
-            self.async_update_listeners()
-            if len(raw_logs) > 10000:
-                _LOGGER.info("Ograniczono rozmiar logów z %d do 10000 znaków", len(raw_logs))
-                raw_logs = raw_logs[-10000:]
-            filtered_logs = self._filter_logs(
-                raw_logs,
-                self.entry.options.get(CONF_LOG_LEVELS, ["ERROR", "WARNING"])
+            # Klient OpenAI (import modułu, utworzenie) przygotowuje się równolegle z odczytem logów
+            filtered_logs, _ = await asyncio.gather(
+                self._get_system_logs(
+                    self.entry.options.get(CONF_LOG_LEVELS, DEFAULT_LOG_LEVELS)
+                ),
+                self.analyzer.async_ensure_client(),
             )
             if not filtered_logs:
                 _LOGGER.info("Brak pasujących logów do analizy")
@@ -361,49 +473,71 @@ class LogAnalysisCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                     "status": "no_logs",
                     "status_description": "Brak pasujących logów do analizy",
                     "progress": 100,
-                    "last_run": datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone)).isoformat(),
+                    "last_run": self._now_iso(),
                     "next_scheduled_run": self.data.get("next_scheduled_run"),
                 }
             self.data["status"] = "analyzing"
             self.data["status_description"] = "Analizuję logi przez AI (może potrwać kilka minut)"
             self.data["progress"] = 50
             self.async_update_listeners()
-            analysis = await self.analyzer.analyze_logs(
-                filtered_logs,
-                self.entry.options.get(CONF_COST_OPTIMIZATION, False)
+            # Termin ponowienia zapisany przed zapytaniem do API: gdy analiza zostanie
+            # przerwana (restart, wyładowanie), po starcie nie pytamy API od razu
+            await self._save_retry_slot(
+                datetime.now(self._tz) + timedelta(seconds=ANALYSIS_RETRY_DELAY)
             )
-            self.data["status"] = "saving"
-            self.data["status_description"] = "Zapisuję raport"
-            self.data["progress"] = 80
-            self.async_update_listeners()
-            await self._save_to_file(analysis, filtered_logs)
-            await self._cleanup_old_reports()
-            # Jeśli helper istnieje, zaktualizuj opcje dropdowna
-            await update_input_select_options(self.hass)
-            next_run = self._calculate_next_run_time()
-            next_run_with_tz = next_run.replace(tzinfo=zoneinfo.ZoneInfo(self.hass.config.time_zone))
+            # Zawieszone API nie może blokować koordynatora w nieskończoność
+            async with asyncio.timeout(ANALYSIS_TIMEOUT):
+                analysis = await self.analyzer.analyze_logs(
+                    filtered_logs,
+                    self.entry.options.get(CONF_COST_OPTIMIZATION, False)
+                )
+            # Zapis raportu to jedno krótkie zadanie executora, a zaraz po nim
+            # async_refresh rozgłasza wynik - osobny stan "saving" nie byłby widoczny
+            # Jeden znacznik czasu dla nazwy pliku, raportu i last_run
+            finished = datetime.now(self._tz)
+            await self._save_to_file(analysis, filtered_logs, finished)
+            # Właśnie zapisany raport jest najnowszy - nie trzeba ponownie listować katalogu
+            self._last_report_time = finished
+            self._last_report_scanned = True
+            next_run = self._next_run_from(finished)
+            # Nowy raport przesuwa termin kolejnej analizy - przestaw jedyny timer
+            self._schedule_next_update(next_run)
             self.data = {
                 **self.data,
                 "status": "success",
                 "status_description": "Raport został wygenerowany pomyślnie",
                 "progress": 100,
-                "last_run": datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone)).isoformat(),
-                "next_scheduled_run": next_run_with_tz.isoformat(),
+                "last_run": finished.isoformat(),
+                "next_scheduled_run": next_run.isoformat(),
             }
-            await self._save_report_times()
+            # last_run trafi do Store razem z terminem, w zapisie zleconym przez _schedule_next_update
             return self.data
         except asyncio.CancelledError:
             _LOGGER.warning("Anulowano operację aktualizacji danych")
-            return {
+            # Termin ponowienia został już zapisany w Store - zostawiamy go
+            self.data = {
                 **self.data,
                 "status": "cancelled",
                 "status_description": "Anulowano generowanie raportu",
                 "progress": 0,
-                "last_run": datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone)).isoformat(),
+                "last_run": self._now_iso(),
+            }
+            raise
+        except TimeoutError:
+            _LOGGER.error("Przekroczono limit czasu analizy logów (%d s)", ANALYSIS_TIMEOUT)
+            # Analiza zakończona - zapisany termin ponowienia zastępujemy bieżącym
+            self._store_next_run_time()
+            return {
+                **self.data,
+                "status": "error",
+                "status_description": f"Przekroczono limit czasu analizy ({ANALYSIS_TIMEOUT} s)",
+                "progress": 0,
+                "error": "timeout",
                 "next_scheduled_run": self.data.get("next_scheduled_run"),
             }
         except Exception as err:
             _LOGGER.exception("Update error: %s", err)
+            self._store_next_run_time()
             return {
                 **self.data,
                 "status": "error",
@@ -413,213 +547,219 @@ class LogAnalysisCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 "next_scheduled_run": self.data.get("next_scheduled_run"),
             }
 
-    def _calculate_next_run_time(self) -> datetime:
-        # Pobierz aktualny czas w strefie czasowej HA
-        now = datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone))
-        # Pobierz wybraną opcję interwału lub domyślną
+    def _now_iso(self) -> str:
+        return datetime.now(self._tz).isoformat()
+
+    async def _calculate_next_run_time(self) -> datetime:
+        # Katalog raportów skanujemy tylko, gdy Store nie zna jeszcze czasu ostatniego
+        # raportu (np. pierwszy start po aktualizacji); dalej jest on w pamięci
+        if not self._last_report_scanned:
+            last_report_date = await self.hass.async_add_executor_job(
+                _latest_report_date_sync, Path(self.hass.config.path("ai_reports"))
+            )
+            if last_report_date:
+                self._last_report_time = datetime.strptime(
+                    last_report_date, "%Y-%m-%d"
+                ).replace(tzinfo=self._tz)
+            self._last_report_scanned = True
+        return self._next_run_from(self._last_report_time)
+
+    def _next_run_from(self, last_report_time: datetime | None) -> datetime:
+        """Compute the next run from the time of the newest report (None if there is none)."""
+        now = datetime.now(tz=self._tz)
         interval_option = self.entry.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
         # Zabezpieczenie na wypadek nieprawidłowej wartości
         interval_days = SCAN_INTERVAL_OPTIONS.get(interval_option, SCAN_INTERVAL_OPTIONS[DEFAULT_SCAN_INTERVAL])
-        report_dir = Path(self.hass.config.path("ai_reports"))
-        last_report_time = None
-        if report_dir.exists():
-            report_files = sorted(
-                report_dir.glob("*.json"),
-                key=lambda f: f.stat().st_ctime,
-                reverse=True
-            )
-            if report_files:
-                last_report_time = datetime.fromtimestamp(report_files[0].stat().st_ctime, tz=zoneinfo.ZoneInfo(self.hass.config.time_zone))
         if last_report_time:
-            next_run = last_report_time.replace(
-                hour=REPORT_GENERATION_HOUR,
-                minute=REPORT_GENERATION_MINUTE,
-                second=0,
-                microsecond=0
-            ) + timedelta(days=interval_days)
-            if next_run <= now:
-                next_run = next_run + timedelta(days=interval_days)
-        else:
-            next_run = now.replace(
-                hour=REPORT_GENERATION_HOUR,
-                minute=REPORT_GENERATION_MINUTE,
-                second=0,
-                microsecond=0
+            next_run = _first_slot_after(
+                last_report_time.date() + timedelta(days=interval_days), now, interval_days
             )
-            if next_run <= now:
-                next_run = next_run + timedelta(days=1)
+        else:
+            next_run = _first_slot_after(now.date(), now, 1)
         _LOGGER.info(f"Zaplanowano następną analizę na: {next_run}")
         return next_run
 
+    @callback
+    def async_cancel_schedule(self) -> None:
+        """Cancel the scheduled analysis for good; used when the entry is unloaded."""
+        self._unloaded = True
+        if self._remove_update_listener:
+            self._remove_update_listener()
+            self._remove_update_listener = None
+
     def _schedule_next_update(self, next_run):
+        if self._unloaded:
+            return
+        # Jedyne miejsce uzbrajania timera: poprzedni jest zawsze anulowany,
+        # więc naraz istnieje co najwyżej jedna zaplanowana analiza
         if self._remove_update_listener:
             self._remove_update_listener()
             self._remove_update_listener = None
         self._remove_update_listener = async_track_point_in_time(
             self.hass, self._handle_update, next_run
         )
-        next_run_with_tz = next_run.replace(tzinfo=zoneinfo.ZoneInfo(self.hass.config.time_zone))
-        self._store_next_run_time(next_run_with_tz)
+        self._next_run = next_run
+        # Nowy słownik zamiast zmiany w miejscu - porównanie w async_refresh wykryje zmianę
+        self.data = {**self.data, "next_scheduled_run": self._next_run.isoformat()}
+        self._store_next_run_time()
 
     async def _handle_update(self, _now=None):
         _LOGGER.info("Rozpoczynam zaplanowaną analizę logów")
+        # Timer jednorazowy już się wykonał
+        self._remove_update_listener = None
         await self.async_refresh()
+        if self._unloaded:
+            return
+        # Bez nowego raportu (brak logów, błąd) termin nie został przestawiony
+        if self._remove_update_listener is None:
+            self._schedule_next_update(await self._calculate_next_run_time())
+            self.async_update_listeners()
 
-    def _store_next_run_time(self, next_run):
-        self.hass.async_create_task(
-            self._store.async_save({
-                "last_run": self.data.get("last_run"),
-                "next_scheduled_run": next_run.isoformat()
-            })
-        )
+    def _store_next_run_time(self):
+        # Bez zmian względem ostatnio zleconego zapisu nie ma czego zapisywać
+        payload = self._stored_run_times()
+        if payload == self._last_persisted:
+            return
+        self._last_persisted = payload
+        # Kolejne przestawienia terminu scalają się w jeden zapis; dane budowane
+        # są dopiero w chwili zapisu, więc zawsze zawierają ostatni termin
+        self._store.async_delay_save(self._stored_run_times, STORE_SAVE_DELAY)
+
+    async def _save_retry_slot(self, retry_at: datetime) -> None:
+        """Persist `retry_at` as the next run right away, before a long API call."""
+        payload = {**self._stored_run_times(), "next_scheduled_run": retry_at.isoformat()}
+        self._last_persisted = payload
+        await self._store.async_save(payload)
+
+    @callback
+    def _stored_run_times(self) -> dict[str, Any]:
+        return {
+            "last_run": self.data.get("last_run"),
+            "next_scheduled_run": self._next_run.isoformat() if self._next_run else None,
+            "last_report": self._last_report_time.isoformat() if self._last_report_time else None,
+        }
 
-    async def _load_stored_next_run_time(self):
+    async def _load_stored_next_run_time(self) -> datetime:
+        """Load the stored run times and return the next run; the timer is not armed here."""
         stored = await self._store.async_load()
         if stored:
+            self._last_persisted = stored
             if "last_run" in stored:
                 self.data["last_run"] = stored.get("last_run")
                 _LOGGER.debug("Wczytano czas ostatniego raportu: %s", self.data["last_run"])
-            if "next_scheduled_run" in stored:
-                try:
-                    next_run_str = stored["next_scheduled_run"]
-                    next_run = datetime.fromisoformat(next_run_str)
-                    now = datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone))
-                    if next_run > now:
-                        self.data["next_scheduled_run"] = next_run_str
-                        self._schedule_next_update(next_run.replace(tzinfo=None))
-                        return True
-                except (ValueError, TypeError) as e:
-                    _LOGGER.error(f"Błąd podczas wczytywania zapisanej daty: {e}")
-        next_run = self._calculate_next_run_time()
-        next_run_with_tz = next_run.replace(tzinfo=zoneinfo.ZoneInfo(self.hass.config.time_zone))
-        self.data["next_scheduled_run"] = next_run_with_tz.isoformat()
-        self._schedule_next_update(next_run)
-        return True
-
-    async def _save_report_times(self):
-        """Zapisuje czasy raportu do trwałego magazynu."""
-        await self._store.async_save({
-            "last_run": self.data["last_run"],
-            "next_scheduled_run": self.data["next_scheduled_run"]
-        })
-        _LOGGER.debug("Zapisano czasy raportu: last_run=%s, next_scheduled_run=%s", 
-                      self.data["last_run"], self.data["next_scheduled_run"])
-
-    async def _get_system_logs(self) -> str:
+            # Zapamiętany czas najnowszego raportu zastępuje skanowanie katalogu
+            if last_report := dt_util.parse_datetime(stored.get("last_report") or ""):
+                self._last_report_time = last_report
+                self._last_report_scanned = True
+            if next_run_str := stored.get("next_scheduled_run"):
+                next_run = dt_util.parse_datetime(next_run_str)
+                if next_run is None:
+                    _LOGGER.error("Błąd podczas wczytywania zapisanej daty: %s", next_run_str)
+                else:
+                    # Daty zapisane bez strefy traktujemy jako czas lokalny HA
+                    if next_run.tzinfo is None:
+                        next_run = next_run.replace(tzinfo=self._tz)
+                    if next_run > datetime.now(tz=self._tz):
+                        return next_run
+        return await self._calculate_next_run_time()
+
+    async def _get_system_logs(self, levels: list) -> str:
+        """Read the log tail and filter it by level in a single executor job."""
         log_path = Path(self.hass.config.path("home-assistant.log"))
         try:
-            content = await self.hass.async_add_executor_job(
-                lambda: log_path.read_text(encoding="utf-8") if log_path.exists() else ""
+            return await self.hass.async_add_executor_job(
+                self._read_and_filter_logs, log_path, levels
             )
-            if not content:
-                _LOGGER.warning("Plik logów jest pusty lub nie istnieje: %s", log_path)
-            return content
         except Exception as err:
             _LOGGER.error("Błąd odczytu logów: %s", err)
             return ""
 
-    def _filter_logs(self, logs: str, levels: list) -> str:
+    def _read_and_filter_logs(self, log_path: Path, levels: list) -> str:
+        raw_logs = _read_log_tail(log_path, MAX_LOG_TAIL_BYTES)
+        if not raw_logs:
+            _LOGGER.warning("Plik logów jest pusty lub nie istnieje: %s", log_path)
+        return self._filter_logs(raw_logs, levels)
+
+    def _get_level_search(self, levels: list):
+        """Return the compiled level-token search for `levels`, reusing the cached one."""
+        key = tuple(levels)
+        if key != self._level_key:
+            mapped_levels = [_LEGACY_LEVEL_LABELS.get(level, level).upper() for level in levels]
+            _LOGGER.debug("Wybrane poziomy logów (po mapowaniu): %s", mapped_levels)
+            # Szukamy tylko tokenu poziomu; granice linii ustalamy dopiero dla trafień
+            self._level_search = re.compile(
+                b" (?:"
+                + b"|".join(re.escape(level.encode("utf-8")) for level in mapped_levels)
+                + b") "
+            ).search if mapped_levels else None
+            self._level_key = key
+        return self._level_search
+
+    def _filter_logs(self, logs: bytes, levels: list) -> str:
         if not logs:
             _LOGGER.debug("Plik logów jest pusty.")
             return ""
-        level_map = {
-            "DEBUG": "DEBUG",
-            "INFO": "INFO",
-            "WARNING": "WARNING",
-            "ERROR": "ERROR",
-            "CRITICAL": "CRITICAL",
-            "Debug": "DEBUG",
-            "Informacyjne": "INFO",
-            "Ostrzeżenia": "WARNING",
-            "Błędy": "ERROR",
-            "Krytyczne": "CRITICAL",
-        }
-        mapped_levels = [level_map.get(level, level).upper() for level in levels]
-        _LOGGER.debug("Wybrane poziomy logów (po mapowaniu): %s", mapped_levels)
-        filtered_lines = []
-        count = 0
-        for line in logs.split('\n'):
-            if any(f" {level} " in line for level in mapped_levels):
-                filtered_lines.append(line)
-                count += 1
-                if count >= 6000:
-                    _LOGGER.info("Osiągnięto limit 6000 linii logów, obcinam pozostałe")
-                    break
-        filtered_logs = '\n'.join(filtered_lines)
-        _LOGGER.debug("Liczba linii po filtracji: %d", len(filtered_lines))
-        return filtered_logs
-
-    async def _save_to_file(self, analysis: str, logs: str) -> None:
-        # Najpierw wyczyść stare raporty przed dodaniem nowego
-        await self._cleanup_old_reports(preserve_space=True)
+        level_search = self._get_level_search(levels)
+        if level_search is None:
+            return ""
+        # Trafione linie trafiają wprost do jednego bufora, bez listy wycinków
+        view = memoryview(logs)
+        filtered = bytearray()
+        line_count = 0
+        pos = 0
+        while match := level_search(logs, pos):
+            start = logs.rfind(b"\n", 0, match.start()) + 1
+            end = logs.find(b"\n", match.end())
+            if end == -1:
+                end = len(logs)
+            if line_count:
+                filtered += b"\n"
+            filtered += view[start:end]
+            line_count += 1
+            if line_count >= 6000:
+                _LOGGER.info("Osiągnięto limit 6000 linii logów, obcinam pozostałe")
+                break
+            pos = end + 1
+        _LOGGER.debug("Liczba linii po filtracji: %d", line_count)
+        if not line_count:
+            # Zwykły dzień bez błędów - nie ma czego dekodować ani analizować
+            return ""
+        return filtered.decode("utf-8", errors="replace")
+
+    async def _save_to_file(self, analysis: str, logs: str, timestamp: datetime) -> None:
         report_dir = Path(self.hass.config.path("ai_reports"))
-        await self.hass.async_add_executor_job(
-            lambda: report_dir.mkdir(exist_ok=True)
-        )
-        # Nowy format nazwy pliku: 2025-05-06.json
-        timestamp = datetime.now(tz=zoneinfo.ZoneInfo(self.hass.config.time_zone))
-        base_filename = f"{timestamp.strftime('%Y-%m-%d')}.json"
-        # Sprawdź czy plik już istnieje i dodaj przyrostek jeśli tak
-        def get_unique_filename():
-            if not (report_dir / base_filename).exists():
-                return base_filename
-            # Szukaj plików z tym samym prefiksem daty
-            date_prefix = timestamp.strftime('%Y-%m-%d')
-            matching_files = list(report_dir.glob(f"{date_prefix}*.json"))
-            # Znajdź najwyższy numer przyrostka
-            highest_suffix = 1
-            for file in matching_files:
-                name = file.stem  # nazwa bez rozszerzenia
-                if "_" in name:
-                    try:
-                        suffix = int(name.split("_")[-1])
-                        highest_suffix = max(highest_suffix, suffix)
-                    except ValueError:
-                        pass
-            # Utwórz nową nazwę z przyrostkiem
-            return f"{date_prefix}_{highest_suffix + 1}.json"
-        filename = await self.hass.async_add_executor_job(get_unique_filename)
-        report_path = report_dir / filename
         data = {
             "timestamp": timestamp.strftime("%Y-%m-%d %H:%M"),
             "report": analysis,
-            "log_snippet": logs[-10000:] if len(logs) > 10000 else logs,
+            # Przefiltrowane logi pochodzą z końcówki ograniczonej do MAX_LOG_TAIL_BYTES,
+            # więc mieszczą się w limicie fragmentu bez dodatkowego cięcia
+            "log_snippet": logs,
         }
-        import aiofiles
-        async with aiofiles.open(report_path, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(data, indent=2, ensure_ascii=False))
+        # orjson zwraca od razu bajty UTF-8, bez ucieczek znaków spoza ASCII
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        max_reports = int(self.entry.options.get(CONF_MAX_REPORTS, "10"))
+        # Czyszczenie, utworzenie katalogu i zapis w jednym zadaniu executora
+        async with self._cleanup_lock:
+            report_path = await self.hass.async_add_executor_job(
+                _write_report_sync, report_dir, timestamp, payload, max_reports
+            )
         _LOGGER.info("Zapisano raport do pliku: %s", report_path)
         # Aktualizuj input_select po zapisaniu pliku
         await update_input_select_options(self.hass)
-        await self.async_request_refresh()
 
-    async def _cleanup_old_reports(self, preserve_space=False) -> None:
-        max_reports = int(self.entry.options.get(CONF_MAX_REPORTS, "10"))
-        # Jeśli mamy zrobić miejsce na nowy raport, zmniejszamy limit o 1
-        if preserve_space:
-            max_reports -= 1
-        report_dir = Path(self.hass.config.path("ai_reports"))
-        exists = await self.hass.async_add_executor_job(
-            lambda: report_dir.exists()
-        )
-        if not exists:
-            return
-        files = await self.hass.async_add_executor_job(
-            lambda: [f for f in report_dir.iterdir() if f.is_file() and f.name.endswith('.json')]
-        )
-        if len(files) <= max_reports:
-            return
-        files_with_time = await self.hass.async_add_executor_job(
-            lambda: [(f, f.stat().st_ctime) for f in files]
-        )
-        # Sortujemy od najstarszego do najnowszego
-        files_with_time.sort(key=lambda x: x[1])
-        # Usuwamy najstarsze pliki, aby osiągnąć docelową liczbę
-        for old_file, _ in files_with_time[:len(files) - max_reports]:
-            try:
-                await self.hass.async_add_executor_job(
-                    lambda f=old_file: f.unlink()
-                )
-                _LOGGER.debug("Usunięto stary raport: %s", old_file)
-            except Exception as e:
-                _LOGGER.error(f"Błąd podczas usuwania raportu {old_file}: {e}")
\ No newline at end of file
+    async def _cleanup_old_reports(self) -> None:
+        # Wywołania nakładające się w czasie łączymy w jedno oczekujące czyszczenie
+        if self._cleanup_pending is None:
+            self._cleanup_pending = self.hass.async_create_task(
+                self._run_pending_cleanup(), f"{DOMAIN} report cleanup"
+            )
+        await asyncio.shield(self._cleanup_pending)
+
+    async def _run_pending_cleanup(self) -> None:
+        async with self._cleanup_lock:
+            self._cleanup_pending = None
+            max_reports = int(self.entry.options.get(CONF_MAX_REPORTS, "10"))
+            report_dir = Path(self.hass.config.path("ai_reports"))
+            await self.hass.async_add_executor_job(
+                _remove_old_reports_sync, report_dir, max_reports
+            )
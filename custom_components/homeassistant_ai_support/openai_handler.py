@@ -4,7 +4,6 @@ from __future__ import annotations
 
 import logging
 import asyncio
-import json
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -61,6 +60,11 @@ class OpenAIAnalyzer:
             _LOGGER.error("Błąd podczas inicjalizacji klienta OpenAI: %s", err)
             raise
 
+    async def async_ensure_client(self):
+        """Upewnij się, że klient jest zainicjalizowany."""
+        if self.client is None:
+            await self.async_init_client()
+
     async def analyze_logs(
         self,
         logs: str,
@@ -70,9 +74,7 @@ class OpenAIAnalyzer:
         if not logs.strip():
             return "Brak logów do analizy"
 
-        # Upewnij się, że klient jest zainicjalizowany
-        if self.client is None:
-            await self.async_init_client()
+        await self.async_ensure_client()
 
         if cost_optimization:
             logs = self._optimize_logs(logs)
@@ -113,6 +115,10 @@ class OpenAIAnalyzer:
                 return response.choices[0].message.content
 
             except asyncio.CancelledError as err:
+                # Anulowanie z zewnątrz (limit czasu, wyładowanie) propagujemy od razu
+                task = asyncio.current_task()
+                if task is not None and task.cancelling():
+                    raise
                 # Jeśli to ostatnia próba, propaguj
                 if attempt == max_retries - 1:
                     _LOGGER.error("Anulowano operację po %d próbach: %s", attempt + 1, err)
@@ -161,20 +167,6 @@ class OpenAIAnalyzer:
 
         return "Nie udało się przeanalizować logów po wielokrotnych próbach."
 
-    async def analyze_anomalies(self, anomalies, context=None):
-        """Analizuje wykryte anomalie."""
-        if not anomalies:
-            return "Nie wykryto anomalii."
-
-        prompt = (
-            "Analizuję następujące anomalie w Home Assistant:\n\n"
-        )
-        if context:
-            prompt += f"Kontekst:\n{json.dumps(context, indent=2, ensure_ascii=False)}\n\n"
-        prompt += json.dumps(anomalies, indent=2, ensure_ascii=False)
-
-        return await self.analyze_logs(prompt, cost_optimization=False)
-
     def _optimize_logs(self, logs: str) -> str:
         lines = logs.split("\n")
         filtered = [
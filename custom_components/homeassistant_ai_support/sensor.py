@@ -3,9 +3,10 @@
 from __future__ import annotations
 
 import json
+import os
 from pathlib import Path
 from datetime import datetime
-import zoneinfo
+from typing import Any
 import logging
 _LOGGER = logging.getLogger(__name__)
 
@@ -17,8 +18,10 @@ from homeassistant.core import HomeAssistant
 from homeassistant.core import Event, EventStateChangedData, callback
 from homeassistant.helpers.event import async_track_state_change_event
 from homeassistant.helpers.restore_state import RestoreEntity
+from homeassistant.util import dt as dt_util
 
 from .const import DOMAIN
+from . import report_sort_key
 
 STATUS_LABELS = {
     "initialization": {"pl": "Inicjalizacja", "en": "Initialization"},
@@ -49,6 +52,50 @@ def translate_status_label(status_key: str, hass):
     lang = get_lang(hass)
     return STATUS_LABELS.get(status_key, {}).get(lang, status_key)
 
+def _read_latest_report_sync(report_dir: Path) -> dict:
+    """Find the newest report and load it, all in one executor job."""
+    try:
+        with os.scandir(report_dir) as it:
+            newest = max(
+                (
+                    entry.name
+                    for entry in it
+                    if entry.name.endswith(".json") and entry.is_file()
+                ),
+                key=report_sort_key,
+                default=None,
+            )
+    except FileNotFoundError:
+        return {}
+    if newest is None:
+        return {}
+    with open(report_dir / newest, "rb") as f:
+        return json.loads(f.read())
+
+def _read_selected_report_sync(report_dir: Path, file_name: str) -> tuple[str | None, Any]:
+    """Validate the selected report path and load it, all in one executor job.
+
+    Returns (problem, data); `problem` is None when the report was loaded.
+    """
+    file_path = report_dir / file_name
+    # Sprawdzenie bezpieczeństwa ścieżki - resolve() dotyka systemu plików
+    try:
+        if not file_path.resolve().is_relative_to(report_dir.resolve()):
+            _LOGGER.error("Próba dostępu do pliku poza dozwolonym katalogiem: %s", file_path)
+            return "outside", None
+    except (ValueError, RuntimeError) as e:
+        _LOGGER.error("Błąd podczas walidacji ścieżki pliku: %s", e)
+        return "invalid", None
+    try:
+        f = open(file_path, "rb")
+    except FileNotFoundError:
+        return "missing", None
+    except IsADirectoryError:
+        _LOGGER.error("Ścieżka nie wskazuje na plik: %s", file_path)
+        return "not_file", None
+    with f:
+        return None, json.loads(f.read())
+
 class LogAnalysisSensor(CoordinatorEntity, SensorEntity, RestoreEntity):
     """Reprezentacja czujnika statusu analizy logów."""
 
@@ -94,11 +141,10 @@ class LogAnalysisSensor(CoordinatorEntity, SensorEntity, RestoreEntity):
             if last_update:
                 try:
                     start_time = datetime.fromisoformat(last_update)
-                    local_tz = self.coordinator.hass.config.time_zone
                     if start_time.tzinfo is None:
-                        start_time = start_time.replace(tzinfo=zoneinfo.ZoneInfo(local_tz))
-                    now = datetime.now(tz=zoneinfo.ZoneInfo(local_tz))
-                    duration = now - start_time
+                        start_time = start_time.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+                    # Różnica czasów nie zależy od strefy - bez budowania ZoneInfo przy każdym zapisie stanu
+                    duration = dt_util.now() - start_time
                     attrs["duration"] = f"{int(duration.total_seconds())} sekund"
                 except Exception:
                     pass
@@ -116,21 +162,13 @@ class LogAnalysisSensor(CoordinatorEntity, SensorEntity, RestoreEntity):
     async def async_update(self):
         """Aktualizuj dane czujnika, w tym raport."""
         report_dir = Path(self.coordinator.hass.config.path("ai_reports"))
-        self._latest_report = {}
-        if report_dir.exists():
-            report_files = sorted(
-                report_dir.glob("*.json"),
-                key=lambda f: f.stat().st_ctime,
-                reverse=True
+        try:
+            self._latest_report = await self.coordinator.hass.async_add_executor_job(
+                _read_latest_report_sync, report_dir
             )
-            if report_files:
-                import aiofiles
-                try:
-                    async with aiofiles.open(report_files[0], 'r', encoding='utf-8') as f:
-                        self._latest_report = json.loads(await f.read())
-                except Exception as e:
-                    _LOGGER.error(f"Błąd odczytu raportu: {e}")
-                    self._latest_report = {}
+        except Exception as e:
+            _LOGGER.error(f"Błąd odczytu raportu: {e}")
+            self._latest_report = {}
                     
     async def async_added_to_hass(self):
         """Uruchamiane gdy encja jest dodawana do hass."""
@@ -177,8 +215,7 @@ class LastReportTimeSensor(CoordinatorEntity, SensorEntity):
                 dt = datetime.fromisoformat(last_run_str)
                 # ustawiamy strefę, jeśli teraz jest naive
                 if dt.tzinfo is None:
-                    tz = zoneinfo.ZoneInfo(self.coordinator.hass.config.time_zone)
-                    dt = dt.replace(tzinfo=tz)
+                    dt = dt.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
                 return dt
             except Exception:
                 return None
@@ -209,8 +246,7 @@ class NextReportTimeSensor(CoordinatorEntity, SensorEntity):
             try:
                 dt = datetime.fromisoformat(next_run_str.replace('Z', '+00:00'))
                 if dt.tzinfo is None:
-                    local_tz = self.coordinator.hass.config.time_zone
-                    dt = dt.replace(tzinfo=zoneinfo.ZoneInfo(local_tz))
+                    dt = dt.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
                 return dt
             except Exception:
                 pass
@@ -254,7 +290,7 @@ class SelectedReportSensor(SensorEntity):
     @callback
     def _input_select_changed_event(self, event: Event[EventStateChangedData]) -> None:
         """Obsługa zdarzeń zmiany stanu input_select."""
-        self.hass.async_create_task(self.async_update())
+        self.hass.async_create_task(self.async_update(), eager_start=True)
 
     @property
     def state(self):
@@ -276,57 +312,31 @@ class SelectedReportSensor(SensorEntity):
         file_name = selected.state
         self._state = file_name
         report_dir = Path(self.hass.config.path("ai_reports"))
-        file_path = report_dir / file_name
 
-        # Sprawdzenie bezpieczeństwa ścieżki
         try:
-            if not file_path.resolve().is_relative_to(report_dir.resolve()):
-                _LOGGER.error("Próba dostępu do pliku poza dozwolonym katalogiem: %s", file_path)
+            problem, data = await self.hass.async_add_executor_job(
+                _read_selected_report_sync, report_dir, file_name
+            )
+            if problem == "missing":
+                self._state = self._no_report_msg
+                self._attr_extra_state_attributes = {"error": "Report file does not exist"}
+            elif problem:
                 self._state = self._no_report_msg
                 self._attr_extra_state_attributes = {}
-                self.async_write_ha_state()
-                return
-        except (ValueError, RuntimeError) as e:
-            _LOGGER.error("Błąd podczas walidacji ścieżki pliku: %s", e)
-            self._state = self._no_report_msg
-            self._attr_extra_state_attributes = {}
-            self.async_write_ha_state()
-            return
-
-        if not await self.hass.async_add_executor_job(lambda: file_path.exists()):
-            self._state = self._no_report_msg
-            self._attr_extra_state_attributes = {"error": "Report file does not exist"}
-            self.async_write_ha_state()
-            return
-
-        if not await self.hass.async_add_executor_job(lambda: file_path.is_file()):
-            _LOGGER.error("Ścieżka nie wskazuje na plik: %s", file_path)
-            self._state = self._no_report_msg
-            self._attr_extra_state_attributes = {}
-            self.async_write_ha_state()
-            return
-
-        try:
-            def _load_json(path):
-                with path.open(encoding="utf-8") as f:
-                    return json.load(f)
-            data = await self.hass.async_add_executor_job(_load_json, file_path)
-
-            if not isinstance(data, dict):
+            elif not isinstance(data, dict):
                 raise ValueError("Raport JSON nie zawiera poprawnych danych (oczekiwano dict)")
-
-            self._attr_extra_state_attributes = {
-                "timestamp": data.get("timestamp"),
-                "report": data.get("report", ""),
-                "log_snippet": data.get("log_snippet", "")
-            }
+            else:
+                self._attr_extra_state_attributes = {
+                    "timestamp": data.get("timestamp"),
+                    "report": data.get("report", ""),
+                    "log_snippet": data.get("log_snippet", "")
+                }
         except Exception as e:
             lang = get_lang(self.hass)
             error_msg = f"Błąd: {e}" if lang == "pl" else f"Error: {e}"
             self._state = error_msg
             self._attr_extra_state_attributes = {"error": str(e)}
-            self.async_write_ha_state()
-        
+
         self.async_write_ha_state()
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
@@ -2,30 +2,33 @@
 
 from homeassistant.components.system_health import SystemHealthRegistration
 from homeassistant.core import HomeAssistant, callback
+import os
 from pathlib import Path
 from .const import DOMAIN
+from . import report_sort_key
 
 
 def _get_report_stats(reports_dir: Path) -> tuple[int, str]:
     """
     Return total number of report files and the date of the last analysis.
     """
-    if not reports_dir.exists() or not reports_dir.is_dir():
+    total = 0
+    newest = ("", 0)
+    try:
+        with os.scandir(reports_dir) as it:
+            # Jedno przejście: liczba raportów i najnowszy według nazwy pliku,
+            # bez sortowania i bez stat() dla każdego pliku
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    total += 1
+                    newest = max(newest, report_sort_key(entry.name))
+    except (FileNotFoundError, NotADirectoryError):
         return 0, "never"
-
-    files = sorted(
-        reports_dir.glob("*.json"),
-        key=lambda x: x.stat().st_ctime,
-        reverse=True
-    )
-    total = len(files)
     if total == 0:
         return 0, "never"
 
     # Filename format: YYYY-MM-DD or YYYY-MM-DD_suffix
-    last_stem = files[0].stem
-    date_part = last_stem.split("_")[0]
-    return total, date_part
+    return total, newest[0] or "never"
 
 
 @callback
@@ -41,7 +44,9 @@ async def system_health_info(hass: HomeAssistant) -> dict[str, str]:
     Provide info for system health dashboard.
     """
     reports_dir = Path(hass.config.path("ai_reports"))
-    total_reports, last_analysis = _get_report_stats(reports_dir)
+    total_reports, last_analysis = await hass.async_add_executor_job(
+        _get_report_stats, reports_dir
+    )
 
     return {
         "integration": DOMAIN,
@@ -0,0 +1,36 @@
+"""Tests for the report scheduling in the coordinator module."""
+
+from datetime import date, datetime, timedelta
+import zoneinfo
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.homeassistant_ai_support.coordinator import (  # noqa: E402
+    _REPORT_TIME,
+    _first_slot_after,
+)
+
+TZ = zoneinfo.ZoneInfo("Europe/Warsaw")
+NOW = datetime(2026, 10, 16, 12, 0, tzinfo=TZ)
+
+
+def test_stale_last_report_gives_future_slot() -> None:
+    """A report far older than the interval must not produce a past slot."""
+    first = date(2026, 1, 1) + timedelta(days=7)
+    next_run = _first_slot_after(first, NOW, 7)
+    assert NOW < next_run <= NOW + timedelta(days=7)
+    assert (next_run.date() - first).days % 7 == 0
+    assert next_run.time() == _REPORT_TIME
+
+
+def test_future_first_date_is_kept() -> None:
+    first = NOW.date() + timedelta(days=3)
+    assert _first_slot_after(first, NOW, 7).date() == first
+
+
+def test_todays_slot_already_passed_moves_to_next_day() -> None:
+    now = datetime.combine(NOW.date(), _REPORT_TIME, TZ) + timedelta(minutes=1)
+    next_run = _first_slot_after(now.date(), now, 1)
+    assert next_run.date() == now.date() + timedelta(days=1)